@@ -1,12 +1,15 @@
 """配置文件"""
 
 import os
+from functools import lru_cache
+from types import MappingProxyType
 
 # 默认输出路径
 DEFAULT_OUTPUT_PATH = r"C:\Users\Administrator\Desktop\something\Toword\output_test"
 
 # 标准字号映射（字号名称 -> 磅值）
-FONT_SIZE_MAP = {
+# 只读映射：共享给各模块/线程时不会被意外修改
+FONT_SIZE_MAP = MappingProxyType({
     "初号": 42,
     "小初": 36,
     "一号": 26,
@@ -23,21 +26,26 @@ FONT_SIZE_MAP = {
     "小六": 6.5,
     "七号": 5.5,
     "八号": 5,
-}
+})
 
 # 字号列表（用于下拉框）
-FONT_SIZE_OPTIONS = list(FONT_SIZE_MAP.keys())
+FONT_SIZE_OPTIONS = tuple(FONT_SIZE_MAP)
+
+# 按磅值升序排列的字号表（用于二分查找最接近的字号）
+_SORTED_FONT_SIZES = sorted(FONT_SIZE_MAP.items(), key=lambda kv: kv[1])
+SIZE_PTS = [size for _, size in _SORTED_FONT_SIZES]
+SIZE_NAMES = [name for name, _ in _SORTED_FONT_SIZES]
 
 # 行间距类型
-LINE_SPACING_TYPES = {
+LINE_SPACING_TYPES = MappingProxyType({
     "单倍行距": {"type": "multiple", "value": 1.0},
     "1.5倍行距": {"type": "multiple", "value": 1.5},
     "2倍行距": {"type": "multiple", "value": 2.0},
     "固定值": {"type": "exact", "value": 20},  # 默认20磅
-}
+})
 
 # 默认样式配置（使用新规范）
-DEFAULT_STYLES = {
+DEFAULT_STYLES = MappingProxyType({
     "heading1": {
         "font_name_cn": "宋体",
         "font_name_en": "Times New Roman",
@@ -160,8 +168,9 @@ DEFAULT_STYLES = {
         "line_spacing_type": "1.5倍行距",
         "line_spacing_value": 1.5,
     },
-}
+})
 
+@lru_cache(maxsize=32)
 def get_font_size_pt(size_name: str) -> float:
     """获取字号对应的磅值"""
     return FONT_SIZE_MAP.get(size_name, 12)
@@ -1,19 +1,157 @@
 """DOCX 文档分析模块 - 用于预览和格式识别"""
 
+import gc
+import re
+import zipfile
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from io import StringIO
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
-from collections import defaultdict
 from docx import Document
 from docx.shared import Pt, Twips
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from lxml import etree
 
-from .config import FONT_SIZE_MAP
+from .config import SIZE_PTS, SIZE_NAMES
 
+# WordprocessingML 命名空间
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
 
-@dataclass
+# w:jc 取值 -> 对齐名称
+_JC_MAP = {
+    "left": "left",
+    "center": "center",
+    "right": "right",
+    "both": "justify",
+    "justify": "justify",
+}
+
+# 超过该大小的文档走流式解析路径，避免整棵文档树驻留内存
+STREAM_SIZE_THRESHOLD = 5 * 1024 * 1024  # 5MB
+
+# 预览文本截断长度
+_PREVIEW_CAP = 100
+
+
+def _cap(text: str, limit: int = _PREVIEW_CAP) -> str:
+    """截断预览文本（超长时以单字符省略号结尾）"""
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+# 标题样式名（"Heading 1" / "标题 1"）；styles.xml 里内置样式名
+# 是小写形式（"heading 1"），必须忽略大小写
+_HEADING_STYLE_RE = re.compile(r'^(?:Heading|标题)\s*(\d+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=64)
+def _heading_info(style_name: str) -> Tuple[bool, int]:
+    """解析样式名中的标题级别，返回 (是否标题, 级别)"""
+    match = _HEADING_STYLE_RE.match(style_name)
+    if match:
+        return True, int(match.group(1))
+    # 非标准命名的标题样式（如"标题"无级别数字）默认一级
+    if style_name.lower().startswith("heading") or "标题" in style_name:
+        return True, 1
+    return False, 0
+
+
+def _w(tag: str) -> str:
+    """构造带 WordprocessingML 命名空间的标签名"""
+    return '{%s}%s' % (W_NS, tag)
+
+
+def _parse_pPr_props(pPr) -> Tuple[str, Optional[float], Optional[float]]:
+    """从 w:pPr 元素直接读取 (对齐方式, 首行缩进pt, 行距)
+
+    绕过 python-docx 的属性机制（每次访问都重新下探 XML），
+    一次遍历取出三个段落格式属性。
+    """
+    alignment = "left"
+    first_line_indent = None
+    line_spacing = None
+
+    if pPr is None:
+        return alignment, first_line_indent, line_spacing
+
+    jc = pPr.find(_w('jc'))
+    if jc is not None:
+        alignment = _JC_MAP.get(jc.get(_w('val')), "left")
+
+    ind = pPr.find(_w('ind'))
+    if ind is not None and ind.get(_w('firstLine')):
+        first_line_indent = float(ind.get(_w('firstLine'))) / 20  # twips -> pt
+
+    spacing = pPr.find(_w('spacing'))
+    if spacing is not None and spacing.get(_w('line')):
+        line_val = float(spacing.get(_w('line')))
+        if spacing.get(_w('lineRule')) in (None, 'auto'):
+            line_spacing = line_val / 240  # 倍数行距
+        else:
+            line_spacing = line_val / 20  # 固定值（磅）
+
+    return alignment, first_line_indent, line_spacing
+
+
+@lru_cache(maxsize=256)
+def _pt_to_size_name_cached(pt: float) -> str:
+    """将磅值转换为字号名称（二分查找最接近的字号）"""
+    idx = bisect_left(SIZE_PTS, pt)
+
+    # 只需比较插入点左右两个候选
+    closest_name = None
+    min_diff = float('inf')
+    for i in (idx - 1, idx):
+        if 0 <= i < len(SIZE_PTS):
+            diff = abs(SIZE_PTS[i] - pt)
+            if diff < min_diff:
+                min_diff = diff
+                closest_name = SIZE_NAMES[i]
+
+    # 如果差距小于0.5磅，返回字号名称
+    if min_diff <= 0.5:
+        return closest_name
+    return f"{pt}磅"
+
+
+@lru_cache(maxsize=1024)
+def _generate_signature_cached(font_name, font_size, bold, italic, alignment) -> str:
+    """生成格式签名（同一格式的段落大量重复，缓存后只计算一次）"""
+    size_part = f"{font_size:.1f}" if font_size else "default"
+    return (f"{font_name or 'default'}|{size_part}|"
+            f"{'B' if bold else ''}|{'I' if italic else ''}|{alignment}")
+
+
+@lru_cache(maxsize=1024)
+def _guess_type_cached(is_heading, heading_level, font_size, bold, alignment) -> str:
+    """猜测段落类型（按格式五元组缓存）"""
+    # 如果已经是标题样式
+    if is_heading:
+        return f"heading{heading_level}"
+
+    # 根据字体大小和格式猜测
+    if font_size:
+        if font_size >= 15 and bold:
+            return "heading1"
+        elif font_size >= 14 and bold:
+            return "heading2"
+        elif font_size >= 12 and bold:
+            return "heading3"
+        elif font_size <= 9:
+            return "caption"
+
+    # 居中的小字可能是图表标题
+    if alignment == "center" and font_size and font_size <= 10:
+        return "caption"
+
+    # 默认为正文
+    return "body"
+
+
+@dataclass(slots=True, frozen=True)
 class ParagraphInfo:
-    """段落信息"""
+    """段落信息（slots 减少每实例内存，大文档下有上万个实例）"""
     index: int
     text: str
     style_name: str
@@ -30,7 +168,7 @@ class ParagraphInfo:
     format_signature: str  # 格式签名，用于分组
 
 
-@dataclass  
+@dataclass(slots=True)
 class FormatGroup:
     """格式分组"""
     signature: str
@@ -66,8 +204,13 @@ class DocxAnalyzer:
         """
         try:
             self.file_path = Path(file_path)
-            self.document = Document(file_path)
-            self._analyze_paragraphs()
+            if self.file_path.stat().st_size > STREAM_SIZE_THRESHOLD:
+                # 大文档：直接流式解析 document.xml，内存占用与文档大小无关
+                self.document = None
+                self._analyze_paragraphs_streaming()
+            else:
+                self.document = Document(file_path)
+                self._analyze_paragraphs()
             self._group_by_format()
             return True
         except Exception as e:
@@ -77,177 +220,276 @@ class DocxAnalyzer:
     def _analyze_paragraphs(self):
         """分析所有段落"""
         self.paragraphs = []
-        
+
+        # 样式级字体缓存：样式名 -> (字体名, 字号, 粗体)
+        # 样式属性访问触发 python-docx 的 XML 查找，按样式名缓存一次即可
+        style_font_cache: Dict[str, Tuple[Optional[str], Optional[float], bool]] = {}
+
+        # 段落格式缓存：pPr 元素 id -> (对齐, 首行缩进, 行距)
+        pPr_cache: Dict[int, Tuple[str, Optional[float], Optional[float]]] = {}
+
         for i, para in enumerate(self.document.paragraphs):
             text = para.text.strip()
             if not text:
                 continue
-            
+
             # 获取样式信息
-            style_name = para.style.name if para.style else "Normal"
-            
+            para_style = para.style
+            style_name = para_style.name if para_style else "Normal"
+
             # 获取字体信息（优先从runs获取）
             font_name = None
             font_size = None
             bold = False
             italic = False
-            
-            if para.runs:
-                run = para.runs[0]
-                if run.font.name:
-                    font_name = run.font.name
-                if run.font.size:
-                    font_size = run.font.size.pt
-                bold = run.font.bold or False
-                italic = run.font.italic or False
-            
-            # 如果runs没有，从样式获取
-            if para.style and para.style.font:
-                if font_name is None and para.style.font.name:
-                    font_name = para.style.font.name
-                if font_size is None and para.style.font.size:
-                    font_size = para.style.font.size.pt
-                if not bold and para.style.font.bold:
+
+            runs = para.runs
+            if runs:
+                run_font = runs[0].font
+                if run_font.name:
+                    font_name = run_font.name
+                if run_font.size:
+                    font_size = run_font.size.pt
+                bold = run_font.bold or False
+                italic = run_font.italic or False
+
+            # 如果runs没有，从样式获取（按样式名缓存）
+            if para_style is not None:
+                if style_name in style_font_cache:
+                    style_font_name, style_font_size, style_bold = style_font_cache[style_name]
+                else:
+                    style_font = para_style.font
+                    if style_font is not None:
+                        style_font_name = style_font.name
+                        style_font_size = style_font.size.pt if style_font.size else None
+                        style_bold = bool(style_font.bold)
+                    else:
+                        style_font_name, style_font_size, style_bold = None, None, False
+                    style_font_cache[style_name] = (style_font_name, style_font_size, style_bold)
+
+                if font_name is None and style_font_name:
+                    font_name = style_font_name
+                if font_size is None and style_font_size:
+                    font_size = style_font_size
+                if not bold and style_bold:
                     bold = True
-            
-            # 获取对齐方式
-            alignment = "left"
-            if para.paragraph_format.alignment:
-                align_map = {
-                    WD_ALIGN_PARAGRAPH.LEFT: "left",
-                    WD_ALIGN_PARAGRAPH.CENTER: "center",
-                    WD_ALIGN_PARAGRAPH.RIGHT: "right",
-                    WD_ALIGN_PARAGRAPH.JUSTIFY: "justify",
-                }
-                alignment = align_map.get(para.paragraph_format.alignment, "left")
-            
-            # 获取首行缩进
-            first_line_indent = None
-            if para.paragraph_format.first_line_indent:
-                first_line_indent = para.paragraph_format.first_line_indent.pt
-            
-            # 获取行间距
-            line_spacing = None
-            if para.paragraph_format.line_spacing:
-                line_spacing = para.paragraph_format.line_spacing
-            
-            # 判断是否是标题
-            is_heading = style_name.startswith("Heading") or "标题" in style_name
-            heading_level = 0
-            if is_heading:
-                try:
-                    heading_level = int(style_name.replace("Heading ", "").replace("标题 ", ""))
-                except:
-                    heading_level = 1
-            
-            # 将磅值转换为字号名称
-            font_size_name = self._pt_to_size_name(font_size)
-            
-            # 生成格式签名
-            format_signature = self._generate_signature(font_name, font_size, bold, italic, alignment)
-            
-            para_info = ParagraphInfo(
-                index=i,
-                text=text[:100] + "..." if len(text) > 100 else text,
-                style_name=style_name,
-                font_name=font_name,
-                font_size=font_size,
-                font_size_name=font_size_name,
-                bold=bold,
-                italic=italic,
-                alignment=alignment,
-                first_line_indent=first_line_indent,
-                line_spacing=line_spacing,
-                is_heading=is_heading,
-                heading_level=heading_level,
-                format_signature=format_signature
-            )
-            
-            self.paragraphs.append(para_info)
+
+            # 段落格式：直接从 w:pPr 读取，按元素 id 去重
+            pPr = para._p.pPr
+            props = pPr_cache.get(id(pPr))
+            if props is None:
+                props = _parse_pPr_props(pPr)
+                if pPr is not None:
+                    pPr_cache[id(pPr)] = props
+            alignment, first_line_indent, line_spacing = props
+
+            self.paragraphs.append(self._build_paragraph_info(
+                i, text, style_name, font_name, font_size, bold, italic,
+                alignment, first_line_indent, line_spacing
+            ))
+
+    def _build_paragraph_info(self, index, text, style_name, font_name,
+                              font_size, bold, italic, alignment,
+                              first_line_indent, line_spacing) -> ParagraphInfo:
+        """由解析出的属性构造 ParagraphInfo"""
+        # 判断是否是标题（按样式名缓存，避免热路径上的异常开销）
+        is_heading, heading_level = _heading_info(style_name)
+
+        # 将磅值转换为字号名称
+        font_size_name = self._pt_to_size_name(font_size)
+
+        # 生成格式签名
+        format_signature = self._generate_signature(font_name, font_size, bold, italic, alignment)
+
+        return ParagraphInfo(
+            index=index,
+            text=_cap(text),
+            style_name=style_name,
+            font_name=font_name,
+            font_size=font_size,
+            font_size_name=font_size_name,
+            bold=bold,
+            italic=italic,
+            alignment=alignment,
+            first_line_indent=first_line_indent,
+            line_spacing=line_spacing,
+            is_heading=is_heading,
+            heading_level=heading_level,
+            format_signature=format_signature
+        )
+
+    def _load_style_table(self, zf: zipfile.ZipFile) -> Dict[str, Tuple[str, Optional[str], Optional[float], bool]]:
+        """从 styles.xml 读取样式表：样式ID -> (显示名, 字体, 字号, 粗体)"""
+        styles: Dict[str, Tuple[str, Optional[str], Optional[float], bool]] = {}
+        try:
+            root = etree.fromstring(zf.read('word/styles.xml'))
+        except (KeyError, etree.XMLSyntaxError):
+            return styles
+
+        for style in root.iter(_w('style')):
+            style_id = style.get(_w('styleId'))
+            if not style_id:
+                continue
+
+            name_elem = style.find(_w('name'))
+            name = name_elem.get(_w('val')) if name_elem is not None else style_id
+
+            font_name = None
+            font_size = None
+            bold = False
+            rPr = style.find(_w('rPr'))
+            if rPr is not None:
+                rFonts = rPr.find(_w('rFonts'))
+                if rFonts is not None:
+                    font_name = rFonts.get(_w('ascii')) or rFonts.get(_w('eastAsia'))
+                sz = rPr.find(_w('sz'))
+                if sz is not None and sz.get(_w('val')):
+                    font_size = float(sz.get(_w('val'))) / 2
+                b = rPr.find(_w('b'))
+                bold = b is not None and b.get(_w('val')) not in ('0', 'false')
+
+            styles[style_id] = (name, font_name, font_size, bold)
+
+        return styles
+
+    def _analyze_paragraphs_streaming(self):
+        """流式分析段落：iterparse 逐个处理 w:p，处理后立即释放
+
+        大文档下避免 python-docx 把整个 document.xml 物化成对象树；
+        表格内的段落不计入（与 document.paragraphs 的索引语义一致）。
+        """
+        self.paragraphs = []
+
+        with zipfile.ZipFile(self.file_path) as zf:
+            style_table = self._load_style_table(zf)
+
+            tbl_tag = _w('tbl')
+            p_tag = _w('p')
+            table_depth = 0
+            index = 0
+
+            with zf.open('word/document.xml') as source:
+                for event, elem in etree.iterparse(source, events=('start', 'end')):
+                    if elem.tag == tbl_tag:
+                        table_depth += 1 if event == 'start' else -1
+                        continue
+                    if event != 'end' or elem.tag != p_tag or table_depth > 0:
+                        continue
+
+                    info = self._parse_paragraph_element(elem, index, style_table)
+                    index += 1
+                    if info is not None:
+                        self.paragraphs.append(info)
+
+                    # 释放已处理的段落及其前面的兄弟节点
+                    elem.clear()
+                    parent = elem.getparent()
+                    if parent is not None:
+                        while elem.getprevious() is not None:
+                            del parent[0]
+
+    def _parse_paragraph_element(self, elem, index: int, style_table) -> Optional[ParagraphInfo]:
+        """从 w:p 元素直接提取段落信息"""
+        text = ''.join(t.text for t in elem.iter(_w('t')) if t.text).strip()
+        if not text:
+            return None
+
+        # 段落样式
+        style_name = "Normal"
+        style_font_name = None
+        style_font_size = None
+        style_bold = False
+
+        pPr = elem.find(_w('pPr'))
+        if pPr is not None:
+            pStyle = pPr.find(_w('pStyle'))
+            if pStyle is not None:
+                style_id = pStyle.get(_w('val'))
+                if style_id in style_table:
+                    style_name, style_font_name, style_font_size, style_bold = style_table[style_id]
+                elif style_id:
+                    style_name = style_id
+
+        alignment, first_line_indent, line_spacing = _parse_pPr_props(pPr)
+
+        # 第一个 run 的字体信息
+        font_name = None
+        font_size = None
+        bold = False
+        italic = False
+
+        run = elem.find(_w('r'))
+        if run is not None:
+            rPr = run.find(_w('rPr'))
+            if rPr is not None:
+                rFonts = rPr.find(_w('rFonts'))
+                if rFonts is not None:
+                    font_name = rFonts.get(_w('ascii')) or rFonts.get(_w('eastAsia'))
+                sz = rPr.find(_w('sz'))
+                if sz is not None and sz.get(_w('val')):
+                    font_size = float(sz.get(_w('val'))) / 2
+                b = rPr.find(_w('b'))
+                bold = b is not None and b.get(_w('val')) not in ('0', 'false')
+                i_elem = rPr.find(_w('i'))
+                italic = i_elem is not None and i_elem.get(_w('val')) not in ('0', 'false')
+
+        # run 没有的信息回退到样式
+        if font_name is None:
+            font_name = style_font_name
+        if font_size is None:
+            font_size = style_font_size
+        if not bold and style_bold:
+            bold = True
+
+        return self._build_paragraph_info(
+            index, text, style_name, font_name, font_size, bold, italic,
+            alignment, first_line_indent, line_spacing
+        )
     
     def _pt_to_size_name(self, pt: Optional[float]) -> Optional[str]:
         """将磅值转换为字号名称"""
         if pt is None:
             return None
-        
-        # 查找最接近的字号
-        closest_name = None
-        min_diff = float('inf')
-        
-        for name, size in FONT_SIZE_MAP.items():
-            diff = abs(size - pt)
-            if diff < min_diff:
-                min_diff = diff
-                closest_name = name
-        
-        # 如果差距小于0.5磅，返回字号名称
-        if min_diff <= 0.5:
-            return closest_name
-        return f"{pt}磅"
+        return _pt_to_size_name_cached(pt)
     
     def _generate_signature(self, font_name, font_size, bold, italic, alignment) -> str:
         """生成格式签名"""
-        parts = [
-            font_name or "default",
-            f"{font_size:.1f}" if font_size else "default",
-            "B" if bold else "",
-            "I" if italic else "",
-            alignment
-        ]
-        return "|".join(str(p) for p in parts)
+        return _generate_signature_cached(font_name, font_size, bold, italic, alignment)
     
     def _group_by_format(self):
-        """按格式分组"""
+        """按格式分组（单遍扫描，只保留每组首个段落的格式信息）"""
         self.format_groups = {}
-        groups = defaultdict(list)
-        
+
         for para in self.paragraphs:
-            groups[para.format_signature].append(para)
-        
-        # 创建格式组
-        for sig, paras in groups.items():
-            first_para = paras[0]
-            
-            # 猜测类型
-            suggested_type = self._guess_type(first_para, len(paras))
-            
-            self.format_groups[sig] = FormatGroup(
-                signature=sig,
-                font_name=first_para.font_name,
-                font_size=first_para.font_size,
-                font_size_name=first_para.font_size_name,
-                bold=first_para.bold,
-                italic=first_para.italic,
-                alignment=first_para.alignment,
-                paragraph_indices=[p.index for p in paras],
-                sample_text=first_para.text[:50],
-                suggested_type=suggested_type,
-                original_type=suggested_type  # 保存原始类型
-            )
+            sig = para.format_signature
+            group = self.format_groups.get(sig)
+            if group is None:
+                # 猜测类型（基于首个段落；数量在此时未知，传1即可）
+                suggested_type = self._guess_type(para, 1)
+
+                self.format_groups[sig] = FormatGroup(
+                    signature=sig,
+                    font_name=para.font_name,
+                    font_size=para.font_size,
+                    font_size_name=para.font_size_name,
+                    bold=para.bold,
+                    italic=para.italic,
+                    alignment=para.alignment,
+                    paragraph_indices=array('i', (para.index,)),
+                    sample_text=_cap(para.text, 50),
+                    suggested_type=suggested_type,
+                    original_type=suggested_type  # 保存原始类型
+                )
+            else:
+                group.paragraph_indices.append(para.index)
+
+        # 回收分组过程中产生的临时对象
+        gc.collect()
     
     def _guess_type(self, para: ParagraphInfo, count: int) -> str:
         """猜测段落类型"""
-        # 如果已经是标题样式
-        if para.is_heading:
-            return f"heading{para.heading_level}"
-        
-        # 根据字体大小和格式猜测
-        if para.font_size:
-            if para.font_size >= 15 and para.bold:
-                return "heading1"
-            elif para.font_size >= 14 and para.bold:
-                return "heading2"
-            elif para.font_size >= 12 and para.bold:
-                return "heading3"
-            elif para.font_size <= 9:
-                return "caption"
-        
-        # 居中的小字可能是图表标题
-        if para.alignment == "center" and para.font_size and para.font_size <= 10:
-            return "caption"
-        
-        # 默认为正文
-        return "body"
+        return _guess_type_cached(para.is_heading, para.heading_level,
+                                  para.font_size, para.bold, para.alignment)
     
     def get_paragraphs_by_format(self, signature: str) -> List[ParagraphInfo]:
         """获取指定格式的所有段落"""
@@ -276,10 +518,20 @@ class DocxAnalyzer:
         
         return summary
     
+    # 段落模板（固定结构用 % 格式化，比逐段拼 f-string 快）
+    _PREVIEW_PARA_TEMPLATE = (
+        '<div class="paragraph %s" data-index="%d" '
+        'data-signature="%s" style="%s">'
+        '%s'
+        '<span class="format-tag">%s</span>'
+        '</div>'
+    )
+
     def get_preview_html(self) -> str:
         """生成预览HTML"""
-        html_parts = ['<html><head><style>']
-        html_parts.append('''
+        buf = StringIO()
+        buf.write('<html><head><style>')
+        buf.write('''
             body { font-family: 'Microsoft YaHei', sans-serif; padding: 20px; }
             .paragraph { margin: 10px 0; padding: 8px; border-radius: 4px; cursor: pointer; }
             .paragraph:hover { background-color: #e3f2fd; }
@@ -291,40 +543,45 @@ class DocxAnalyzer:
             .body { font-size: 12px; }
             .caption { font-size: 10px; text-align: center; color: #666; }
         ''')
-        html_parts.append('</style></head><body>')
-        
+        buf.write('</style></head><body>')
+
+        # 同一签名的段落共享 type_class / style / format_info，按签名缓存
+        sig_cache: Dict[str, Tuple[str, str, str]] = {}
+
         for para in self.paragraphs:
-            css_class = para.format_signature.replace("|", "_").replace(".", "_")
-            type_class = self.format_groups[para.format_signature].suggested_type
-            
-            style_parts = []
-            if para.font_name:
-                style_parts.append(f"font-family: '{para.font_name}'")
-            if para.font_size:
-                style_parts.append(f"font-size: {para.font_size}pt")
-            if para.bold:
-                style_parts.append("font-weight: bold")
-            if para.italic:
-                style_parts.append("font-style: italic")
-            if para.alignment:
-                style_parts.append(f"text-align: {para.alignment}")
-            
-            style = "; ".join(style_parts)
-            
-            format_info = f"{para.font_name or '默认'} | {para.font_size_name or '默认'}"
-            if para.bold:
-                format_info += " | 加粗"
-            
-            html_parts.append(
-                f'<div class="paragraph {type_class}" data-index="{para.index}" '
-                f'data-signature="{para.format_signature}" style="{style}">'
-                f'{para.text}'
-                f'<span class="format-tag">{format_info}</span>'
-                f'</div>'
-            )
-        
-        html_parts.append('</body></html>')
-        return ''.join(html_parts)
+            sig = para.format_signature
+            cached = sig_cache.get(sig)
+            if cached is None:
+                type_class = self.format_groups[sig].suggested_type
+
+                style_parts = []
+                if para.font_name:
+                    style_parts.append(f"font-family: '{para.font_name}'")
+                if para.font_size:
+                    style_parts.append(f"font-size: {para.font_size}pt")
+                if para.bold:
+                    style_parts.append("font-weight: bold")
+                if para.italic:
+                    style_parts.append("font-style: italic")
+                if para.alignment:
+                    style_parts.append(f"text-align: {para.alignment}")
+
+                style = "; ".join(style_parts)
+
+                format_info = f"{para.font_name or '默认'} | {para.font_size_name or '默认'}"
+                if para.bold:
+                    format_info += " | 加粗"
+
+                cached = (type_class, style, format_info)
+                sig_cache[sig] = cached
+
+            type_class, style, format_info = cached
+            buf.write(self._PREVIEW_PARA_TEMPLATE % (
+                type_class, para.index, sig, style, para.text, format_info
+            ))
+
+        buf.write('</body></html>')
+        return buf.getvalue()
     
     def assign_type_to_format(self, signature: str, element_type: str):
         """将格式分配为特定类型
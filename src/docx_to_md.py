@@ -2,192 +2,577 @@
 
 import os
 import re
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from pathlib import Path
 import mammoth
-from docx import Document
-from bs4 import BeautifulSoup
+from lxml import etree
+
+# WordprocessingML 命名空间
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def _w(tag: str) -> str:
+    """构造带 WordprocessingML 命名空间的标签名"""
+    return '{%s}%s' % (W_NS, tag)
+
+
+# 标题样式名匹配（"Heading 1" / "heading1" / "标题 1"）
+_HEADING_STYLE_RE = re.compile(r'(?:heading|标题)\s*(\d)', re.IGNORECASE)
+
+# 表格单元格文本转义表：竖线转义为 \|，换行压平为空格
+_PIPE_ESCAPE = str.maketrans({'|': '\\|', '\n': ' '})
+
+
+def _text(el) -> str:
+    """提取元素子树的纯文本（itertext 不产生中间列表）"""
+    return ''.join(el.itertext()).strip()
+
+
+def _convert_file_worker(task):
+    """批量转换的子进程工作函数
+
+    每个进程各自创建转换器实例，避免跨进程序列化。
+    返回 (输入路径, 输出路径或None, 错误信息或None)。
+    """
+    input_path, output_path = task
+    try:
+        DocxToMarkdown().convert_to_markdown(input_path, output_path)
+        return input_path, output_path, None
+    except Exception as e:
+        return input_path, None, str(e)
 
 
 class DocxToMarkdown:
     """DOCX 转 Markdown 转换器"""
-    
+
+    # 直接输出的块级元素
+    BLOCK_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'img', 'hr'}
+
+    # 标题标签 -> Markdown 前缀（避免每次做 int(tag[1]) 运算）
+    HEADING_PREFIXES = {f'h{i}': '#' * i for i in range(1, 7)}
+
+    # 需要整体处理的复合元素（内部子元素不单独输出）
+    COMPOSITE_TAGS = {'ul', 'ol', 'table', 'blockquote', 'pre'}
+
+    # 行内格式标记（开始标记, 结束标记）
+    INLINE_MARKERS = {
+        'strong': ('**', '**'),
+        'b': ('**', '**'),
+        'em': ('*', '*'),
+        'i': ('*', '*'),
+        'code': ('`', '`'),
+    }
+
     def __init__(self):
         self.supported_extensions = ['.docx', '.doc']
-    
+
     def convert_to_markdown(self, input_path: str, output_path: str = None,
                            progress_callback=None) -> str:
         """将DOCX转换为Markdown
-        
+
         Args:
             input_path: DOCX文件路径
             output_path: 输出Markdown文件路径（可选）
             progress_callback: 进度回调函数
-            
+
         Returns:
             Markdown内容或输出文件路径
         """
         input_path = Path(input_path)
         if not input_path.exists():
             raise FileNotFoundError(f"文件不存在: {input_path}")
-        
+
         if input_path.suffix.lower() not in self.supported_extensions:
             raise ValueError(f"不支持的文件格式: {input_path.suffix}")
-        
+
         if progress_callback:
             progress_callback(10, "读取Word文档...")
-        
-        # 使用mammoth进行转换
-        with open(input_path, 'rb') as docx_file:
-            result = mammoth.convert_to_html(docx_file)
-            html = result.value
-        
-        if progress_callback:
-            progress_callback(50, "转换为Markdown...")
-        
-        # 将HTML转换为Markdown
-        md_content = self._html_to_markdown(html)
-        
-        if progress_callback:
-            progress_callback(90, "处理完成...")
-        
+
+        # 有输出文件时逐块流式写入，全文不在内存中拼接
         if output_path:
             output_path = Path(output_path)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(md_content)
-            
+            written = False
+            if self._can_convert_directly(input_path):
+                try:
+                    self._write_blocks(self._direct_docx_to_md(input_path), output_path)
+                    written = True
+                except Exception:
+                    written = False  # 解析失败则回退到 mammoth 重写
+
+            if not written:
+                html = self._convert_with_mammoth(input_path, progress_callback)
+                self._write_blocks(self._iter_markdown_blocks(html), output_path)
+
             if progress_callback:
                 progress_callback(100, "保存完成")
-            
+
             return str(output_path)
-        
+
+        # 无输出路径：返回完整字符串
+        md_content = None
+        if self._can_convert_directly(input_path):
+            try:
+                md_content = '\n\n'.join(self._direct_docx_to_md(input_path))
+            except Exception:
+                md_content = None  # 解析失败则回退到 mammoth
+
+        if md_content is None:
+            html = self._convert_with_mammoth(input_path, progress_callback)
+            md_content = self._html_to_markdown(html)
+
         if progress_callback:
             progress_callback(100, "转换完成")
-        
+
         return md_content
-    
+
+    def convert_batch(self, input_paths, output_dir, max_workers=None,
+                      progress_callback=None):
+        """批量转换多个DOCX文件（多进程并行）
+
+        Args:
+            input_paths: DOCX文件路径列表
+            output_dir: 输出目录
+            max_workers: 最大进程数（默认取CPU核数）
+            progress_callback: 进度回调函数
+
+        Returns:
+            [(输入路径, 输出路径或None, 错误信息或None), ...]
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        tasks = [
+            (str(path), str(output_dir / f"{Path(path).stem}.md"))
+            for path in input_paths
+        ]
+
+        results = []
+        total = len(tasks)
+
+        if total <= 1:
+            # 单个文件不值得启动进程池
+            results = [_convert_file_worker(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                for i, result in enumerate(
+                        executor.map(_convert_file_worker, tasks, chunksize=4), 1):
+                    results.append(result)
+                    if progress_callback:
+                        progress_callback(int(100 * i / total), f"已完成 {i}/{total}")
+
+        if progress_callback:
+            progress_callback(100, "批量转换完成")
+
+        return results
+
+    def _convert_with_mammoth(self, input_path: Path, progress_callback=None) -> str:
+        """回退路径：使用mammoth转换为HTML（处理图片、OLE 对象等复杂情况）"""
+        with open(input_path, 'rb') as docx_file:
+            result = mammoth.convert_to_html(docx_file)
+            html = result.value
+
+        if progress_callback:
+            progress_callback(50, "转换为Markdown...")
+
+        return html
+
+    def _write_blocks(self, blocks, output_path: Path):
+        """将 Markdown 块流式写入文件，峰值内存只有单个块"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            first = True
+            for block in blocks:
+                if not block:
+                    continue
+                if not first:
+                    f.write('\n\n')
+                f.write(block)
+                first = False
+
+    def _can_convert_directly(self, input_path: Path) -> bool:
+        """判断能否走直接 docx→markdown 路径
+
+        含图片或嵌入对象的文档交给 mammoth 处理（需要 base64 内联）。
+        """
+        if input_path.suffix.lower() != '.docx':
+            return False
+        try:
+            with zipfile.ZipFile(input_path) as zf:
+                names = zf.namelist()
+        except zipfile.BadZipFile:
+            return False
+        if 'word/document.xml' not in names:
+            return False
+        return not any(
+            name.startswith(('word/media/', 'word/embeddings/'))
+            for name in names
+        )
+
+    def _load_style_names(self, zf: zipfile.ZipFile) -> dict:
+        """从 styles.xml 读取样式表：样式ID -> 显示名"""
+        names = {}
+        try:
+            root = etree.fromstring(zf.read('word/styles.xml'))
+        except (KeyError, etree.XMLSyntaxError):
+            return names
+        for style in root.iter(_w('style')):
+            style_id = style.get(_w('styleId'))
+            if not style_id:
+                continue
+            name_elem = style.find(_w('name'))
+            names[style_id] = name_elem.get(_w('val')) if name_elem is not None else style_id
+        return names
+
+    def _load_numbering_formats(self, zf: zipfile.ZipFile) -> dict:
+        """从 numbering.xml 读取编号格式：(numId, ilvl) -> numFmt"""
+        formats = {}
+        try:
+            root = etree.fromstring(zf.read('word/numbering.xml'))
+        except (KeyError, etree.XMLSyntaxError):
+            return formats
+
+        # abstractNumId -> {ilvl: numFmt}
+        abstract = {}
+        for abs_num in root.iter(_w('abstractNum')):
+            abs_id = abs_num.get(_w('abstractNumId'))
+            levels = {}
+            for lvl in abs_num.iter(_w('lvl')):
+                fmt_elem = lvl.find(_w('numFmt'))
+                if fmt_elem is not None:
+                    levels[lvl.get(_w('ilvl'))] = fmt_elem.get(_w('val'))
+            abstract[abs_id] = levels
+
+        for num in root.iter(_w('num')):
+            num_id = num.get(_w('numId'))
+            abs_ref = num.find(_w('abstractNumId'))
+            if abs_ref is None:
+                continue
+            for ilvl, fmt in abstract.get(abs_ref.get(_w('val')), {}).items():
+                formats[(num_id, ilvl)] = fmt
+
+        return formats
+
+    def _direct_docx_to_md(self, input_path: Path):
+        """直接从 document.xml 流式生成 Markdown 块
+
+        跳过 mammoth 的 HTML 中间层：iterparse 逐个处理 w:p / w:tbl，
+        每个块处理完立即释放，峰值内存只有一个段落/表格。
+        """
+        with zipfile.ZipFile(input_path) as zf:
+            style_names = self._load_style_names(zf)
+            num_formats = self._load_numbering_formats(zf)
+
+            tbl_tag = _w('tbl')
+            p_tag = _w('p')
+            table_depth = 0
+            list_counters = defaultdict(int)  # (numId, ilvl) -> 当前编号
+            list_items = []  # 连续的列表项合并为一个块
+
+            with zf.open('word/document.xml') as source:
+                for event, elem in etree.iterparse(source, events=('start', 'end')):
+                    tag = elem.tag
+                    if tag == tbl_tag:
+                        if event == 'start':
+                            table_depth += 1
+                        else:
+                            table_depth -= 1
+                            if table_depth == 0:
+                                if list_items:
+                                    yield '\n'.join(list_items)
+                                    list_items = []
+                                md = self._render_docx_table(elem)
+                                if md:
+                                    yield md
+                                elem.clear()
+                        continue
+
+                    if event != 'end' or tag != p_tag or table_depth > 0:
+                        continue
+
+                    block, is_list_item = self._render_docx_paragraph(
+                        elem, style_names, num_formats, list_counters
+                    )
+
+                    if is_list_item:
+                        list_items.append(block)
+                    else:
+                        if list_items:
+                            yield '\n'.join(list_items)
+                            list_items = []
+                        if block:
+                            yield block
+
+                    elem.clear()
+                    parent = elem.getparent()
+                    if parent is not None:
+                        while elem.getprevious() is not None:
+                            del parent[0]
+
+            if list_items:
+                yield '\n'.join(list_items)
+
+    def _render_docx_paragraph(self, elem, style_names, num_formats, list_counters):
+        """渲染单个 w:p 元素，返回 (markdown文本, 是否列表项)"""
+        t_tag = _w('t')
+        text_parts = []
+
+        for run in elem.iter(_w('r')):
+            run_text = ''.join(t.text for t in run.iter(t_tag) if t.text)
+            if not run_text:
+                continue
+            rPr = run.find(_w('rPr'))
+            if rPr is not None and run_text.strip():
+                b = rPr.find(_w('b'))
+                if b is not None and b.get(_w('val')) not in ('0', 'false'):
+                    run_text = f"**{run_text}**"
+                i = rPr.find(_w('i'))
+                if i is not None and i.get(_w('val')) not in ('0', 'false'):
+                    run_text = f"*{run_text}*"
+            text_parts.append(run_text)
+
+        text = ''.join(text_parts).strip()
+        if not text:
+            return '', False
+
+        pPr = elem.find(_w('pPr'))
+        if pPr is not None:
+            # 标题样式 -> "#" 前缀
+            pStyle = pPr.find(_w('pStyle'))
+            if pStyle is not None:
+                style_id = pStyle.get(_w('val')) or ''
+                style_name = style_names.get(style_id, style_id)
+                match = _HEADING_STYLE_RE.search(style_name) or _HEADING_STYLE_RE.search(style_id)
+                if match:
+                    level = int(match.group(1))
+                    plain = ''.join(t.text for t in elem.iter(t_tag) if t.text).strip()
+                    return f"{'#' * level} {plain}", False
+
+                # 列表样式（编号定义挂在样式上而非段落的 numPr）
+                if style_name.startswith('List Bullet'):
+                    return f"- {text}", True
+                if style_name.startswith('List Number'):
+                    list_counters[style_name] += 1
+                    return f"{list_counters[style_name]}. {text}", True
+
+            # 编号段落 -> 列表项
+            numPr = pPr.find(_w('numPr'))
+            if numPr is not None:
+                numId_elem = numPr.find(_w('numId'))
+                ilvl_elem = numPr.find(_w('ilvl'))
+                num_id = numId_elem.get(_w('val')) if numId_elem is not None else None
+                ilvl = ilvl_elem.get(_w('val')) if ilvl_elem is not None else '0'
+                if num_id is not None:
+                    indent = '    ' * int(ilvl or 0)
+                    fmt = num_formats.get((num_id, ilvl), 'bullet')
+                    if fmt == 'bullet':
+                        return f"{indent}- {text}", True
+                    list_counters[(num_id, ilvl)] += 1
+                    return f"{indent}{list_counters[(num_id, ilvl)]}. {text}", True
+
+        return text, False
+
+    def _render_docx_table(self, elem) -> str:
+        """渲染 w:tbl 元素为 Markdown 表格"""
+        t_tag = _w('t')
+        md_rows = []
+
+        for i, row in enumerate(elem.iter(_w('tr'))):
+            cell_texts = []
+            for cell in row.iter(_w('tc')):
+                cell_text = ''.join(t.text for t in cell.iter(t_tag) if t.text)
+                cell_texts.append(cell_text.strip().translate(_PIPE_ESCAPE))
+            md_rows.append('| ' + ' | '.join(cell_texts) + ' |')
+
+            if i == 0:
+                separator = '| ' + ' | '.join(['---'] * len(cell_texts)) + ' |'
+                md_rows.append(separator)
+
+        return '\n'.join(md_rows)
+
     def _html_to_markdown(self, html: str) -> str:
         """将HTML转换为Markdown"""
-        soup = BeautifulSoup(html, 'lxml')
-        
-        # 处理各种元素
-        md_lines = []
-        
-        for element in soup.body.children if soup.body else soup.children:
-            md = self._process_element(element)
-            if md:
-                md_lines.append(md)
-        
-        return '\n\n'.join(md_lines)
-    
-    def _process_element(self, element, depth=0) -> str:
-        """处理单个HTML元素"""
-        if element.name is None:
-            text = str(element).strip()
-            return text if text else ''
-        
-        if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            level = int(element.name[1])
-            text = element.get_text().strip()
-            return f"{'#' * level} {text}"
-        
-        elif element.name == 'p':
-            content = self._process_inline(element)
-            return content.strip() if content.strip() else ''
-        
-        elif element.name == 'ul':
-            items = []
-            for li in element.find_all('li', recursive=False):
-                text = self._process_inline(li)
-                items.append(f"- {text}")
-            return '\n'.join(items)
-        
-        elif element.name == 'ol':
-            items = []
-            for i, li in enumerate(element.find_all('li', recursive=False), 1):
-                text = self._process_inline(li)
-                items.append(f"{i}. {text}")
-            return '\n'.join(items)
-        
-        elif element.name == 'blockquote':
-            text = element.get_text().strip()
-            lines = text.split('\n')
-            return '\n'.join([f"> {line}" for line in lines])
-        
-        elif element.name in ['pre', 'code']:
-            code = element.get_text()
-            return f"```\n{code}\n```"
-        
-        elif element.name == 'table':
-            return self._process_table(element)
-        
-        elif element.name == 'img':
-            src = element.get('src', '')
-            alt = element.get('alt', '')
+        return '\n\n'.join(self._iter_markdown_blocks(html))
+
+    def _iter_markdown_blocks(self, html: str):
+        """流式生成 Markdown 块
+
+        使用 lxml iterparse 做单遍流式解析：块级元素在 end 事件时
+        直接产出 Markdown 行，处理完立即 clear() 释放内存，
+        避免构建完整 DOM 后再做递归遍历。
+        """
+        if not html or not html.strip():
+            return
+
+        composite_depth = 0  # 复合元素（列表/表格/引用/代码块）嵌套深度
+        p_depth = 0  # 未闭合的 <p> 层数：段内 img 归 _render_inline 处理
+
+        context = etree.iterparse(
+            BytesIO(html.encode('utf-8')),
+            events=('start', 'end'),
+            html=True
+        )
+
+        for event, elem in context:
+            tag = elem.tag
+            if not isinstance(tag, str):
+                continue  # 跳过注释等特殊节点
+
+            if event == 'start':
+                if tag in self.COMPOSITE_TAGS:
+                    composite_depth += 1
+                elif tag == 'p':
+                    p_depth += 1
+                continue
+
+            # end 事件：元素已完整，可以输出
+            if tag == 'p':
+                p_depth -= 1
+            if tag in self.COMPOSITE_TAGS:
+                composite_depth -= 1
+                if composite_depth == 0:
+                    md = self._render_composite(elem)
+                    if md:
+                        yield md
+                    elem.clear()
+            elif composite_depth == 0 and tag in self.BLOCK_TAGS:
+                if tag == 'img' and p_depth > 0:
+                    # 段落内的图片留给外层 p 的行内渲染，这里不可 clear()
+                    continue
+                md = self._render_block(elem)
+                if md:
+                    yield md
+                elem.clear()
+
+    def _render_block(self, elem) -> str:
+        """渲染单个块级元素"""
+        tag = elem.tag
+
+        prefix = self.HEADING_PREFIXES.get(tag)
+        if prefix:
+            return f"{prefix} {_text(elem)}"
+
+        if tag == 'p':
+            content = self._render_inline(elem)
+            return content.strip()
+
+        if tag == 'img':
+            src = elem.get('src', '')
+            alt = elem.get('alt', '')
             return f"![{alt}]({src})"
-        
-        elif element.name == 'hr':
+
+        if tag == 'hr':
             return '---'
-        
-        elif element.name in ['div', 'section', 'article', 'span']:
-            results = []
-            for child in element.children:
-                result = self._process_element(child, depth + 1)
-                if result:
-                    results.append(result)
-            return '\n\n'.join(results)
-        
-        else:
-            return element.get_text().strip()
-    
-    def _process_inline(self, element) -> str:
-        """处理行内元素"""
-        if element.name is None:
-            return str(element)
-        
-        result = []
-        for child in element.children:
-            if child.name is None:
-                result.append(str(child))
-            elif child.name == 'strong' or child.name == 'b':
-                text = child.get_text()
-                result.append(f"**{text}**")
-            elif child.name == 'em' or child.name == 'i':
-                text = child.get_text()
-                result.append(f"*{text}*")
-            elif child.name == 'code':
-                text = child.get_text()
-                result.append(f"`{text}`")
-            elif child.name == 'a':
-                text = child.get_text()
-                href = child.get('href', '')
-                result.append(f"[{text}]({href})")
-            elif child.name == 'img':
-                src = child.get('src', '')
-                alt = child.get('alt', '')
-                result.append(f"![{alt}]({src})")
-            elif child.name == 'br':
-                result.append('\n')
+
+        return ''
+
+    def _render_composite(self, elem) -> str:
+        """渲染复合元素（列表、表格、引用、代码块）"""
+        tag = elem.tag
+
+        if tag == 'ul':
+            render_inline = self._render_inline
+            return '\n'.join(
+                f"- {render_inline(li).strip()}"
+                for li in elem if li.tag == 'li'
+            )
+
+        if tag == 'ol':
+            render_inline = self._render_inline
+            return '\n'.join(
+                f"{i}. {render_inline(li).strip()}"
+                for i, li in enumerate(
+                    (li for li in elem if li.tag == 'li'), 1
+                )
+            )
+
+        if tag == 'blockquote':
+            lines = _text(elem).split('\n')
+            return '\n'.join([f"> {line}" for line in lines])
+
+        if tag == 'pre':
+            code = ''.join(elem.itertext())
+            return f"```\n{code}\n```"
+
+        if tag == 'table':
+            return self._render_table(elem)
+
+        return ''
+
+    def _render_inline(self, element) -> str:
+        """渲染元素的行内内容
+
+        SAX 风格的单遍标记流：显式栈展开子树，开始/结束标记按
+        dispatch 表直接写入输出列表，栈深恒定、无 Python 递归帧。
+        """
+        parts = []
+        emit = parts.append
+        if element.text:
+            emit(element.text)
+
+        # 栈元素：('text', 字符串) 或 ('elem', 节点)
+        stack = [('elem', child) for child in reversed(element)]
+        push = stack.append
+        markers = self.INLINE_MARKERS
+
+        while stack:
+            kind, item = stack.pop()
+            if kind == 'text':
+                emit(item)
+                continue
+
+            node = item
+            tag = node.tag if isinstance(node.tag, str) else None
+
+            # tail 在子节点和结束标记之后输出，先入栈
+            if node.tail:
+                push(('text', node.tail))
+
+            if tag == 'br':
+                emit('\n')
+            elif tag == 'img':
+                src = node.get('src', '')
+                alt = node.get('alt', '')
+                emit(f"![{alt}]({src})")
+            elif tag == 'a':
+                href = node.get('href', '')
+                push(('text', f"]({href})"))
+                for child in reversed(node):
+                    push(('elem', child))
+                emit('[')
+                if node.text:
+                    emit(node.text)
+            elif tag in markers:
+                open_mark, close_mark = markers[tag]
+                push(('text', close_mark))
+                for child in reversed(node):
+                    push(('elem', child))
+                emit(open_mark)
+                if node.text:
+                    emit(node.text)
             else:
-                result.append(self._process_inline(child))
-        
-        return ''.join(result)
-    
-    def _process_table(self, table) -> str:
-        """处理表格"""
-        rows = table.find_all('tr')
-        if not rows:
-            return ''
-        
-        md_rows = []
-        
-        for i, row in enumerate(rows):
-            cells = row.find_all(['th', 'td'])
-            cell_texts = [cell.get_text().strip().replace('|', '\\|') for cell in cells]
-            md_rows.append('| ' + ' | '.join(cell_texts) + ' |')
-            
+                # 未知标签：透明处理，只保留文本和子节点
+                for child in reversed(node):
+                    push(('elem', child))
+                if node.text:
+                    emit(node.text)
+
+        return ''.join(parts)
+
+    def _render_table(self, table) -> str:
+        """渲染表格"""
+        return '\n'.join(self._iter_table_rows(table))
+
+    def _iter_table_rows(self, table):
+        """逐行产出表格的 Markdown 行，不整表缓存"""
+        for i, row in enumerate(table.iter('tr')):
+            cell_texts = [
+                _text(cell).translate(_PIPE_ESCAPE)
+                for cell in row if cell.tag in ('th', 'td')
+            ]
+            yield '| ' + ' | '.join(cell_texts) + ' |'
+
             # 添加表头分隔行
             if i == 0:
-                separator = '| ' + ' | '.join(['---'] * len(cells)) + ' |'
-                md_rows.append(separator)
-        
-        return '\n'.join(md_rows)
+                yield '| ' + ' | '.join(['---'] * len(cell_texts)) + ' |'
@@ -1,20 +1,192 @@
 """智能排版与格式优化模块"""
 
+import copy
+import hashlib
+import mmap
 import os
+import shutil
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt, Cm
+from lxml import etree
+
 from .docx_to_md import DocxToMarkdown
 from .md_converter import MarkdownConverter
-from .config import DEFAULT_STYLES
+from .config import DEFAULT_STYLES, get_font_size_pt
+
+# 预计算的 WordprocessingML 限定名（避免热路径里重复解析命名空间前缀）
+_QN_RFONTS = qn('w:rFonts')
+_QN_SZ = qn('w:sz')
+_QN_SZCS = qn('w:szCs')
+_QN_B = qn('w:b')
+_QN_BCS = qn('w:bCs')
+_QN_COLOR = qn('w:color')
+_QN_ASCII = qn('w:ascii')
+_QN_HANSI = qn('w:hAnsi')
+_QN_EASTASIA = qn('w:eastAsia')
+_QN_CS = qn('w:cs')
+_QN_VAL = qn('w:val')
+_QN_NUMPR = qn('w:numPr')
+_QN_NUMID = qn('w:numId')
+_QN_ILVL = qn('w:ilvl')
+_QN_NUM = qn('w:num')
+_QN_ABSTRACTNUMID = qn('w:abstractNumId')
+_QN_ABSTRACTNUM = qn('w:abstractNum')
+_QN_LVL = qn('w:lvl')
+_QN_RPR = qn('w:rPr')
+_QN_PPR = qn('w:pPr')
+
+# _update_rPr_font 需要清除的既有子元素（完整限定名，直接与 child.tag 比较）
+_CLEAR_QNAMES = frozenset((_QN_RFONTS, _QN_SZ, _QN_SZCS, _QN_B, _QN_BCS, _QN_COLOR))
+
+# 逐 run 套用字体模板前需要清除的子元素
+_RUN_CLEAR_QNAMES = frozenset((_QN_RFONTS, _QN_SZ, _QN_B))
+
+def _NOOP_PROGRESS(p, m):
+    """progress_callback 为 None 时的空回调，省去逐处判空"""
+
+
+# 对齐方式查找表与固定行距标记（避免每段重建 dict 和中文字符串比较）
+_ALIGN_MAP = {
+    'left': WD_ALIGN_PARAGRAPH.LEFT,
+    'center': WD_ALIGN_PARAGRAPH.CENTER,
+    'right': WD_ALIGN_PARAGRAPH.RIGHT,
+    'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
+}
+_ALIGN_DEFAULT = WD_ALIGN_PARAGRAPH.LEFT
+_LINE_SPACING_EXACT = '固定值'
+
+# 预编译的 XPath：一次 C 级遍历取编号信息，替代逐级 find
+_W_NSMAP = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+_HAS_NUMPR_XPATH = etree.XPath('./w:pPr/w:numPr', namespaces=_W_NSMAP)
+_NUMBERED_PS_XPATH = etree.XPath('.//w:p[./w:pPr/w:numPr]', namespaces=_W_NSMAP)
+_NUMID_XPATH = etree.XPath('./w:pPr/w:numPr/w:numId/@w:val', namespaces=_W_NSMAP)
+_ILVL_XPATH = etree.XPath('./w:pPr/w:numPr/w:ilvl/@w:val', namespaces=_W_NSMAP)
+
+@lru_cache(maxsize=64)
+def _build_font_elements(font_cn, font_en, sz_val, bold):
+    """按 (字体, 字号, 粗体) 组合缓存 rPr 子元素模板
+
+    文档里通常只出现少数几种组合，命中缓存后每次调用只剩 deepcopy。
+    """
+    rFonts = OxmlElement('w:rFonts')
+    rFonts.set(_QN_ASCII, font_en)
+    rFonts.set(_QN_HANSI, font_en)
+    rFonts.set(_QN_EASTASIA, font_cn)
+    rFonts.set(_QN_CS, font_en)
+
+    sz = OxmlElement('w:sz')
+    sz.set(_QN_VAL, sz_val)
+
+    szCs = OxmlElement('w:szCs')
+    szCs.set(_QN_VAL, sz_val)
+
+    elements = [rFonts, sz, szCs]
+
+    if bold:
+        elements.append(OxmlElement('w:b'))
+        elements.append(OxmlElement('w:bCs'))
+
+    # 颜色固定为黑色（清除彩色编号）
+    color = OxmlElement('w:color')
+    color.set(_QN_VAL, '000000')
+    elements.append(color)
+
+    return tuple(elements)
+
+
+# 一次选择性格式化调用的共享状态：文档、编号索引与各类缓存
+_FormatContext = namedtuple(
+    '_FormatContext',
+    ['doc', 'numbering_index', 'patched_lvls', 'numbered_cache', 'lock'],
+)
+
+
+def _freeze(value):
+    """递归冻结嵌套 dict/list，生成可哈希的缓存键"""
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    """把 _freeze 的结果还原为普通 dict/list"""
+    if isinstance(value, frozenset):
+        return {k: _thaw(v) for k, v in value}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _flatten_styles(nested):
+    """把 {类别: {属性: 值}} 展平为 {(类别, 属性): 值}"""
+    return {
+        (outer, inner): val
+        for outer, style in nested.items()
+        for inner, val in style.items()
+    }
+
+
+def _unflatten_styles(flat):
+    """把展平的样式表还原为嵌套 dict"""
+    nested = {}
+    for (outer, inner), val in flat.items():
+        nested.setdefault(outer, {})[inner] = val
+    return nested
+
+
+# 默认样式的展平形式，合并时一次 dict.update 即可完成覆盖
+_DEFAULT_STYLES_FLAT = _flatten_styles(DEFAULT_STYLES)
+
+
+@lru_cache(maxsize=16)
+def _merge_styles_cached(styles_key):
+    """按冻结键缓存的样式合并：默认样式 + 自定义覆盖"""
+    flat = dict(_DEFAULT_STYLES_FLAT)
+    flat.update(_flatten_styles(_thaw(styles_key)))
+    return _unflatten_styles(flat)
+
+
+def _merge_styles(styles: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并自定义样式到默认样式，重复调用同一配置时命中缓存"""
+    if not styles:
+        return {**DEFAULT_STYLES}
+    return dict(_merge_styles_cached(_freeze(styles)))
 
 
 class SmartFormatter:
     """智能排版与格式优化器"""
-    
+
+    # 需要做编号段落检查的类型；其余类型（正文、图表标题等）不涉及编号处理
+    _NUMBERING_CHECK_TYPES = frozenset((
+        'heading1', 'heading2', 'heading3', 'heading4', 'list', 'numbered',
+    ))
+
+    # 映射段落数超过该值才启用线程池，小批量走串行避免线程开销
+    _PARALLEL_THRESHOLD = 50
+
+    # 渲染结果缓存上限（内容+样式相同的重复渲染直接复用产物）
+    _RENDER_CACHE_SIZE = 4
+
+    __slots__ = ('docx_to_md', 'md_converter', '_numbering_lock', '_render_cache')
+
     def __init__(self, api_key: str = None):
         self.docx_to_md = DocxToMarkdown()
         self.md_converter = MarkdownConverter()
+        self._numbering_lock = threading.Lock()
+        self._render_cache = {}
     
     def format_document(self, input_path: str, output_path: str,
                        styles: Dict[str, Any] = None,
@@ -37,149 +209,212 @@ class SmartFormatter:
         """
         input_path = Path(input_path)
         output_path = Path(output_path)
-        
+        progress_callback = progress_callback or _NOOP_PROGRESS
+
         if not input_path.exists():
             raise FileNotFoundError(f"文件不存在: {input_path}")
         
         suffix = input_path.suffix.lower()
-        
-        if progress_callback:
-            progress_callback(5, "读取文件...")
-        
+
+        # 快捷路径：DOCX 输入且既无样式覆盖也不做AI优化时，整个转换往返是空操作
+        if suffix in ('.docx', '.doc') and not styles and not use_ai:
+            progress_callback(10, "无需格式转换，直接复制...")
+            shutil.copyfile(input_path, output_path)
+            progress_callback(100, "格式化完成")
+            return str(output_path)
+
+        progress_callback(5, "读取文件...")
+
         # 步骤1: 将文件转换为Markdown（如果是DOCX）
         if suffix in ['.docx', '.doc']:
-            if progress_callback:
-                progress_callback(10, "将Word转换为Markdown...")
-            
+            progress_callback(10, "将Word转换为Markdown...")
+
             md_content = self.docx_to_md.convert_to_markdown(str(input_path))
             base_dir = input_path.parent
             
         elif suffix in ['.md', '.markdown']:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                md_content = f.read()
+            # mmap 读取：直接在映射页上解码，省去中间 bytes 拷贝
+            with open(input_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    md_content = ''
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        md_content = str(memoryview(mm), 'utf-8')
             base_dir = input_path.parent
         else:
             raise ValueError(f"不支持的文件格式: {suffix}")
         
-        if progress_callback:
-            progress_callback(30, "文件读取完成")
-        
+        progress_callback(30, "文件读取完成")
+
         # 步骤2: 跳过AI优化（已移除AI模块）
-        if progress_callback:
-            progress_callback(60, "准备生成文档...")
-        
+        progress_callback(60, "准备生成文档...")
+
         # 步骤3: 转换为DOCX并应用样式
-        if progress_callback:
-            progress_callback(65, "生成Word文档...")
+        progress_callback(65, "生成Word文档...")
         
         # 合并样式
-        final_styles = {**DEFAULT_STYLES}
-        if styles:
-            for key, value in styles.items():
-                if key in final_styles:
-                    final_styles[key] = {**final_styles[key], **value}
-                else:
-                    final_styles[key] = value
-        
+        final_styles = _merge_styles(styles)
+
         self.md_converter.styles = final_styles
-        
+
+        # 预览场景常以相同内容和样式反复渲染：按 (内容哈希, 样式哈希, 图片目录)
+        # 缓存转换产物，命中时直接写出文件
+        cache_key = (
+            hashlib.blake2b(md_content.encode('utf-8'), digest_size=16).digest(),
+            hash(tuple(sorted(_flatten_styles(final_styles).items()))),
+            str(base_dir),
+        )
+        cached = self._render_cache.get(cache_key)
+        if cached is not None:
+            progress_callback(70, "命中缓存，写出文档...")
+            with open(output_path, 'wb') as f:
+                f.write(cached)
+            progress_callback(100, "格式化完成")
+            return str(output_path)
+
         def inner_progress(p, msg):
-            if progress_callback:
-                # 将内部进度映射到65-95%
-                mapped_progress = 65 + int(p * 0.3)
-                progress_callback(mapped_progress, msg)
-        
+            # 将内部进度映射到65-95%
+            progress_callback(65 + int(p * 0.3), msg)
+
         result = self.md_converter.convert_from_string(
-            md_content, 
+            md_content,
             str(output_path),
             progress_callback=inner_progress,
             base_dir=str(base_dir)
         )
-        
-        if progress_callback:
-            progress_callback(100, "格式化完成")
-        
+
+        # 缓存本次产物，超限时淘汰最早的一份
+        try:
+            with open(output_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = None
+        if data is not None:
+            if len(self._render_cache) >= self._RENDER_CACHE_SIZE:
+                self._render_cache.pop(next(iter(self._render_cache)))
+            self._render_cache[cache_key] = data
+
+        progress_callback(100, "格式化完成")
+
         return result
     
 
     def apply_selective_format(self, input_path: str, output_path: str,
                                paragraph_mappings: Dict[int, str],
                                styles: Dict[str, Any] = None,
-                               progress_callback=None) -> str:
+                               progress_callback=None,
+                               parallel: bool = True) -> str:
         """选择性格式化：只修改用户指定的段落，其他保持原样
-        
+
         Args:
             input_path: 输入DOCX文件路径
             output_path: 输出DOCX文件路径
             paragraph_mappings: {段落索引: 类型} 的映射，只有这些段落会被修改
             styles: 样式配置
             progress_callback: 进度回调
-            
+            parallel: 段落数较多时用线程池并行套用样式
+
         Returns:
             输出文件路径
         """
-        from docx import Document
-        from docx.shared import Pt, Cm
-        from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-        from docx.oxml.ns import qn
-        from .config import get_font_size_pt
-        
-        if progress_callback:
-            progress_callback(10, "读取文档...")
-        
+        progress_callback = progress_callback or _NOOP_PROGRESS
+        progress_callback(10, "读取文档...")
+
         # 打开原始文档
         doc = Document(input_path)
         
         # 合并样式配置
-        final_styles = {**DEFAULT_STYLES}
-        if styles:
-            for key, value in styles.items():
-                if key in final_styles:
-                    final_styles[key] = {**final_styles[key], **value}
-                else:
-                    final_styles[key] = value
-        
-        if progress_callback:
-            progress_callback(30, "应用格式修改...")
+        final_styles = _merge_styles(styles)
         
-        total = len(paragraph_mappings)
+        # 预解析样式：字号名换算磅值、行距转浮点，循环内不再做字符串转换
+        resolved_styles = {}
+        for key, value in final_styles.items():
+            resolved = dict(value)
+            font_size = resolved.get('font_size', 12)
+            if isinstance(font_size, str):
+                resolved['font_size'] = get_font_size_pt(font_size)
+            spacing_value = resolved.get('line_spacing_value', 1.5)
+            if isinstance(spacing_value, str):
+                try:
+                    spacing_value = float(spacing_value)
+                except:
+                    spacing_value = 1.5
+            resolved['line_spacing_value'] = float(spacing_value)
+            resolved['_ls_exact'] = \
+                resolved.get('line_spacing_type', '1.5倍行距') == _LINE_SPACING_EXACT
+            resolved['_align'] = _ALIGN_MAP.get(
+                resolved.get('alignment', 'left'), _ALIGN_DEFAULT)
+            resolved_styles[key] = resolved
+
+        # 本次调用的共享上下文：编号索引建一次，缓存随调用结束释放
+        ctx = _FormatContext(
+            doc=doc,
+            numbering_index=self._build_numbering_index(doc),
+            patched_lvls=set(),
+            numbered_cache={},
+            lock=self._numbering_lock,
+        )
+
+        progress_callback(30, "应用格式修改...")
+
+        # doc.paragraphs 是每次访问都重建列表的属性，只取一次快照
+        paragraphs = doc.paragraphs
+        para_count = len(paragraphs)
+        body_style = resolved_styles.get('body', {})
+        items = [
+            (paragraphs[para_idx], resolved_styles.get(type_id, body_style), type_id)
+            for para_idx, type_id in paragraph_mappings.items()
+            if para_idx < para_count
+        ]
+
+        # 单次 XPath 扫描标出全部编号段落，循环内的编号判定退化为缓存命中
+        numbered_ids = {id(p) for p in _NUMBERED_PS_XPATH(doc.element.body)}
+        for para, _, _ in items:
+            elem_id = id(para._element)
+            ctx.numbered_cache[elem_id] = elem_id in numbered_ids
+
+        total = len(items)
         processed = 0
-        
-        for para_idx, type_id in paragraph_mappings.items():
-            if para_idx < len(doc.paragraphs):
-                para = doc.paragraphs[para_idx]
-                style = final_styles.get(type_id, final_styles.get('body', {}))
-                
-                self._apply_style_to_paragraph(para, style, type_id, doc)
-                
+
+        def apply_one(item):
+            para, style, type_id = item
+            self._apply_style_to_paragraph(para, style, type_id, ctx)
+
+        if parallel and total > self._PARALLEL_THRESHOLD:
+            # 各段落子树相互独立；编号定义修补在 _apply_numbering_font 内加锁
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                for _ in executor.map(apply_one, items):
+                    processed += 1
+                    # 大文档按批上报进度，摊薄回调开销
+                    if processed & 63 == 0 or processed == total:
+                        prog = 30 + int(60 * processed / total)
+                        progress_callback(prog, f"格式化段落 {processed}/{total}")
+        else:
+            for item in items:
+                apply_one(item)
                 processed += 1
-                if progress_callback and total > 0:
+                if processed & 63 == 0 or processed == total:
                     prog = 30 + int(60 * processed / total)
                     progress_callback(prog, f"格式化段落 {processed}/{total}")
-        
-        if progress_callback:
-            progress_callback(95, "保存文档...")
-        
+
+        progress_callback(95, "保存文档...")
+
         doc.save(output_path)
-        
-        if progress_callback:
-            progress_callback(100, "完成")
-        
+
+        progress_callback(100, "完成")
+
         return output_path
 
-    def _apply_style_to_paragraph(self, para, style: dict, type_id: str, doc=None):
+    def _apply_style_to_paragraph(self, para, style: dict, type_id: str, ctx=None):
         """将样式应用到单个段落"""
-        from docx.shared import Pt, Cm
-        from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-        from docx.oxml.ns import qn
-        from docx.oxml import OxmlElement
-        from .config import get_font_size_pt
-        
         pf = para.paragraph_format
-        
+
         # 段前段后间距（编号段落不设置额外间距以避免空行）
-        is_numbered = self._is_numbered_paragraph(para)
-        self._doc = doc  # 保存文档引用供后续使用
+        # 编号处理只对可能带编号的类型有意义，正文/图表标题等映射直接跳过检查
+        if type_id in self._NUMBERING_CHECK_TYPES:
+            is_numbered = self._is_numbered_paragraph(para, ctx)
+        else:
+            is_numbered = False
         if not is_numbered:
             if 'space_before' in style:
                 pf.space_before = Pt(style['space_before'])
@@ -190,120 +425,132 @@ class SmartFormatter:
             pf.space_before = Pt(0)
             pf.space_after = Pt(0)
         
-        # 行距
-        spacing_type = style.get('line_spacing_type', '1.5倍行距')
+        # 行距（样式已在 apply_selective_format 中预解析为浮点值和固定行距标记）
         spacing_value = style.get('line_spacing_value', 1.5)
-        if isinstance(spacing_value, str):
-            try:
-                spacing_value = float(spacing_value)
-            except:
-                spacing_value = 1.5
-        
-        if spacing_type == '固定值':
+        ls_exact = style.get('_ls_exact')
+        if ls_exact is None:
+            ls_exact = style.get('line_spacing_type', '1.5倍行距') == _LINE_SPACING_EXACT
+
+        if ls_exact:
             pf.line_spacing_rule = WD_LINE_SPACING.EXACTLY
-            pf.line_spacing = Pt(float(spacing_value))
+            pf.line_spacing = Pt(spacing_value)
         else:
-            pf.line_spacing = float(spacing_value)
-        
-        # 对齐方式
-        alignment = style.get('alignment', 'left')
-        align_map = {
-            'left': WD_ALIGN_PARAGRAPH.LEFT,
-            'center': WD_ALIGN_PARAGRAPH.CENTER,
-            'right': WD_ALIGN_PARAGRAPH.RIGHT,
-            'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
-        }
-        pf.alignment = align_map.get(alignment, WD_ALIGN_PARAGRAPH.LEFT)
+            pf.line_spacing = spacing_value
+
+        # 对齐方式（预解析为枚举值）
+        alignment = style.get('_align')
+        if alignment is None:
+            alignment = _ALIGN_MAP.get(style.get('alignment', 'left'), _ALIGN_DEFAULT)
+        pf.alignment = alignment
         
         # 首行缩进（正文）
+        font_size = style.get('font_size', 12)
         if type_id == 'body' and 'first_line_indent' in style:
-            indent_chars = style['first_line_indent']
-            font_size = style.get('font_size', 12)
-            if isinstance(font_size, str):
-                font_size = get_font_size_pt(font_size)
-            pf.first_line_indent = Pt(font_size * indent_chars)
-        
+            pf.first_line_indent = Pt(font_size * style['first_line_indent'])
+
         # 字体设置
         font_cn = style.get('font_name_cn', style.get('font_name', '宋体'))
         font_en = style.get('font_name_en', style.get('font_name', 'Times New Roman'))
-        font_size = style.get('font_size', 12)
-        if isinstance(font_size, str):
-            font_size = get_font_size_pt(font_size)
         bold = style.get('bold', False)
         
+        # 构建一次 rPr 字体模板，逐 run 克隆子元素，绕过 font.* 属性描述符
+        rFonts = OxmlElement('w:rFonts')
+        rFonts.set(_QN_ASCII, font_en)
+        rFonts.set(_QN_HANSI, font_en)
+        rFonts.set(_QN_EASTASIA, font_cn)
+
+        b = OxmlElement('w:b')
+        if not bold:
+            b.set(_QN_VAL, '0')
+
+        sz = OxmlElement('w:sz')
+        sz.set(_QN_VAL, str(int(font_size * 2)))
+
+        template_children = (rFonts, b, sz)
+
         for run in para.runs:
-            run.font.name = font_en
-            run.font.size = Pt(font_size)
-            run.font.bold = bold
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
+            rPr = run._element.get_or_add_rPr()
+            preserved = [c for c in rPr.iterchildren() if c.tag not in _RUN_CLEAR_QNAMES]
+            if len(preserved) != len(rPr):
+                rPr.clear()
+                rPr.extend(preserved)
+            for child in template_children:
+                rPr.append(copy.deepcopy(child))
         
         # 如果是编号段落，还需要修改编号的字体
         if is_numbered:
-            self._apply_numbering_font(para, font_cn, font_en, font_size, bold)
-
-    def _is_numbered_paragraph(self, para) -> bool:
-        """检查段落是否为编号段落"""
-        from docx.oxml.ns import qn
-        pPr = para._element.pPr
-        if pPr is not None:
-            numPr = pPr.find(qn('w:numPr'))
-            if numPr is not None:
-                return True
-        return False
-
-    def _apply_numbering_font(self, para, font_cn: str, font_en: str, font_size: float, bold: bool):
+            self._apply_numbering_font(para, font_cn, font_en, font_size, bold, ctx)
+
+    def _build_numbering_index(self, doc):
+        """单次遍历编号部件，建立 numId→abstractNumId 与 (absNumId, ilvl)→lvl 索引"""
+        num_to_abs = {}
+        lvl_map = {}
+
+        try:
+            if doc is not None and hasattr(doc, 'part') and \
+                    hasattr(doc.part, 'numbering_part') and doc.part.numbering_part:
+                numbering = doc.part.numbering_part.numbering_definitions._numbering
+
+                for num in numbering.findall(_QN_NUM):
+                    abstractNumId = num.find(_QN_ABSTRACTNUMID)
+                    if abstractNumId is not None:
+                        num_to_abs[num.get(_QN_NUMID)] = abstractNumId.get(_QN_VAL)
+
+                for absNum in numbering.findall(_QN_ABSTRACTNUM):
+                    absNumId = absNum.get(_QN_ABSTRACTNUMID)
+                    for lvl in absNum.findall(_QN_LVL):
+                        lvl_map[(absNumId, lvl.get(_QN_ILVL))] = lvl
+        except Exception:
+            pass
+
+        return num_to_abs, lvl_map
+
+    def _is_numbered_paragraph(self, para, ctx=None) -> bool:
+        """检查段落是否为编号段落（单次调用内按元素缓存）"""
+        elem = para._element
+        cache = ctx.numbered_cache if ctx is not None else None
+        if cache is not None:
+            cached = cache.get(id(elem))
+            if cached is not None:
+                return cached
+
+        result = bool(_HAS_NUMPR_XPATH(elem))
+
+        if cache is not None:
+            cache[id(elem)] = result
+        return result
+
+    def _apply_numbering_font(self, para, font_cn: str, font_en: str,
+                              font_size: float, bold: bool, ctx=None):
         """应用字体到编号 - 通过修改文档的编号定义"""
-        from docx.shared import Pt
-        from docx.oxml.ns import qn
-        from docx.oxml import OxmlElement
-        
-        pPr = para._element.pPr
+        elem = para._element
+        pPr = elem.pPr
         if pPr is None:
             return
-        
-        # 获取编号属性
-        numPr = pPr.find(qn('w:numPr'))
-        if numPr is None:
-            return
-        
-        # 获取 numId 和 ilvl
-        numId_elem = numPr.find(qn('w:numId'))
-        ilvl_elem = numPr.find(qn('w:ilvl'))
-        
-        if numId_elem is None:
+
+        # 编号属性：预编译 XPath 直接取属性值
+        numId_vals = _NUMID_XPATH(elem)
+        if not numId_vals:
             return
-        
-        numId = numId_elem.get(qn('w:val'))
-        ilvl = ilvl_elem.get(qn('w:val')) if ilvl_elem is not None else '0'
-        
-        # 使用保存的文档引用来修改编号定义
-        doc = getattr(self, '_doc', None)
-        if doc is not None:
-            try:
-                if hasattr(doc, 'part') and hasattr(doc.part, 'numbering_part') and doc.part.numbering_part:
-                    numbering = doc.part.numbering_part.numbering_definitions._numbering
-                    
-                    # 查找对应的 num 元素
-                    for num in numbering.findall(qn('w:num')):
-                        if num.get(qn('w:numId')) == numId:
-                            abstractNumId = num.find(qn('w:abstractNumId'))
-                            if abstractNumId is not None:
-                                absNumId = abstractNumId.get(qn('w:val'))
-                                # 查找 abstractNum
-                                for absNum in numbering.findall(qn('w:abstractNum')):
-                                    if absNum.get(qn('w:abstractNumId')) == absNumId:
-                                        # 查找对应级别的 lvl
-                                        for lvl in absNum.findall(qn('w:lvl')):
-                                            if lvl.get(qn('w:ilvl')) == ilvl:
-                                                self._update_lvl_font(lvl, font_cn, font_en, font_size, bold)
-                                                break
-                                        break
-                            break
-            except Exception:
-                pass
+
+        numId = numId_vals[0]
+        ilvl_vals = _ILVL_XPATH(elem)
+        ilvl = ilvl_vals[0] if ilvl_vals else '0'
+
+        # 修改编号定义：相同 (numId, ilvl, 字体) 组合只修补一次
+        # 加锁：编号部件是线程间共享的
+        if ctx is not None:
+            patch_key = (numId, ilvl, font_cn, font_en, font_size, bold)
+            with ctx.lock:
+                if patch_key not in ctx.patched_lvls:
+                    num_to_abs, lvl_map = ctx.numbering_index
+                    lvl = lvl_map.get((num_to_abs.get(numId), ilvl))
+                    if lvl is not None:
+                        self._update_lvl_font(lvl, font_cn, font_en, font_size, bold)
+                    ctx.patched_lvls.add(patch_key)
         
         # 同时在段落级别设置 rPr 作为备用
-        rPr = pPr.find(qn('w:rPr'))
+        rPr = pPr.find(_QN_RPR)
         if rPr is None:
             rPr = OxmlElement('w:rPr')
             pPr.insert(0, rPr)
@@ -312,11 +559,8 @@ class SmartFormatter:
     
     def _update_lvl_font(self, lvl, font_cn: str, font_en: str, font_size: float, bold: bool):
         """更新编号级别的字体设置"""
-        from docx.oxml.ns import qn
-        from docx.oxml import OxmlElement
-        
         # 查找或创建 rPr
-        rPr = lvl.find(qn('w:rPr'))
+        rPr = lvl.find(_QN_RPR)
         if rPr is None:
             rPr = OxmlElement('w:rPr')
             lvl.append(rPr)
@@ -325,43 +569,21 @@ class SmartFormatter:
     
     def _update_rPr_font(self, rPr, font_cn: str, font_en: str, font_size: float, bold: bool):
         """更新 rPr 元素的字体设置（包括清除颜色）"""
-        from docx.oxml.ns import qn
-        from docx.oxml import OxmlElement
-        
-        # 清除现有字体设置和颜色
-        for child in list(rPr):
-            tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-            if tag in ['rFonts', 'sz', 'szCs', 'b', 'bCs', 'color']:
-                rPr.remove(child)
-        
-        # 设置字体
-        rFonts = OxmlElement('w:rFonts')
-        rFonts.set(qn('w:ascii'), font_en)
-        rFonts.set(qn('w:hAnsi'), font_en)
-        rFonts.set(qn('w:eastAsia'), font_cn)
-        rFonts.set(qn('w:cs'), font_en)
-        rPr.append(rFonts)
-        
-        # 设置字号
-        sz = OxmlElement('w:sz')
-        sz.set(qn('w:val'), str(int(font_size * 2)))
-        rPr.append(sz)
-        
-        szCs = OxmlElement('w:szCs')
-        szCs.set(qn('w:val'), str(int(font_size * 2)))
-        rPr.append(szCs)
-        
-        # 设置粗体
-        if bold:
-            b = OxmlElement('w:b')
-            rPr.append(b)
-            bCs = OxmlElement('w:bCs')
-            rPr.append(bCs)
-        
-        # 设置颜色为黑色（清除彩色编号）
-        color = OxmlElement('w:color')
-        color.set(qn('w:val'), '000000')
-        rPr.append(color)
+        # 清除现有字体设置和颜色：保留不相关子元素，一次 clear + extend 换掉其余
+        preserved = [c for c in rPr.iterchildren() if c.tag not in _CLEAR_QNAMES]
+        if len(preserved) != len(rPr):
+            attrib = dict(rPr.attrib)
+            rPr.clear()
+            for name, value in attrib.items():
+                rPr.set(name, value)
+            rPr.extend(preserved)
+
+        # 字体名 intern 后作缓存键，模板命中后逐个克隆
+        templates = _build_font_elements(
+            sys.intern(font_cn), sys.intern(font_en),
+            str(int(font_size * 2)), bold)
+        for tpl in templates:
+            rPr.append(copy.deepcopy(tpl))
 
 
 class StylePreset:
@@ -475,16 +697,19 @@ class StylePreset:
         },
     }
     
-    @classmethod
-    def get_preset(cls, name: str) -> dict:
+    @staticmethod
+    def get_preset(name: str) -> dict:
         """获取预设样式"""
-        presets = {
-            "academic": cls.ACADEMIC,
-            "official": cls.OFFICIAL,
-        }
-        return presets.get(name.lower(), DEFAULT_STYLES)
-    
-    @classmethod
-    def list_presets(cls) -> list:
+        return _PRESETS.get(name.lower(), DEFAULT_STYLES)
+
+    @staticmethod
+    def list_presets() -> list:
         """列出所有预设"""
-        return ["academic", "official"]
+        return list(_PRESETS)
+
+
+# 预设查找表（模块级构建一次，避免每次调用重建 dict）
+_PRESETS = {
+    "academic": StylePreset.ACADEMIC,
+    "official": StylePreset.OFFICIAL,
+}
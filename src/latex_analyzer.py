@@ -1,30 +1,95 @@
 """LaTeX 文档分析模块 - 用于预览和格式识别"""
 
 import re
+from array import array
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+# (行号, 行文本) 二元组的投影，在 C 层完成取第二项
+_GET1 = itemgetter(1)
 
-@dataclass
+# 预编译的正则（逐行热循环里省掉 re 模块的缓存查找）
+_RE_BEGIN = re.compile(r'\\begin\{(\w+\*?)\}')
+_RE_END = re.compile(r'\\end\{(\w+\*?)\}')
+_RE_CAPTION = re.compile(r'\\caption\{([^}]*)\}')
+_RE_CODE_CAPTION = re.compile(r'caption=([^,\]]+)')
+_RE_CMD_ARGS = re.compile(r'^\\[a-zA-Z]+(\[[^\]]*\])?(\{[^}]*\})?\s*$')
+_RE_CMD_NAME = re.compile(r'\\[a-zA-Z]+')
+_RE_OPT_ARG = re.compile(r'\[[^\]]*\]')
+_RE_BRACE_ARG = re.compile(r'\{([^}]*)\}')
+_RE_ANY_CMD = re.compile(r'\\[a-zA-Z]+\*?(\[[^\]]*\])?(\{[^}]*\})?')
+_RE_BRACE_DOLLAR = re.compile(r'[{}$$]')
+_RE_HEADING_CMD = re.compile(
+    r'\\(chapter|section|subsection|subsubsection|paragraph|subparagraph)\b')
+
+_RE_WS = re.compile(r'\s+')
+
+# _clean_latex 的清理规则融合成一个备选式，整串只扫描一遍
+# 分支按出现频率排列：带文本的包裹命令在前，纯删除类在后
+_RE_CLEAN = re.compile(
+    r'\\(?:textbf|textit|emph|underline|caption)\{([^}]*)\}'
+    r'|\\(?:(?:sub)*section|chapter|paragraph)\*?\{([^}]*)\}'
+    r'|\\label\{[^}]*\}'
+    r'|\\ref\{[^}]*\}'
+    r'|\\cite\{[^}]*\}'
+    r'|\\item\b\s*(?:\[[^\]]*\])?'
+    r'|\\begin\{\w+\}'
+    r'|\\end\{\w+\}'
+    r'|\\\w+'
+    r'|[{}]'
+)
+
+
+def _clean_latex_sub(match):
+    """_RE_CLEAN 命中后的分派：解包、替换或删除"""
+    text = match.group(1)
+    if text is None:
+        text = match.group(2)
+    if text is not None:
+        # 包裹命令：递归清理其内容（处理 \section{\textbf{..}} 之类的嵌套）
+        return _RE_CLEAN.sub(_clean_latex_sub, text)
+
+    token = match.group(0)
+    # 带 { 才是 \ref/\cite 专属分支的命中；\refstepcounter、\citep 等
+    # 前缀相同的命令走 \w+ 分支整体删除，不能误替换成占位符
+    if token.startswith(r'\ref{'):
+        return '[ref]'
+    if token.startswith(r'\cite{'):
+        return '[cite]'
+    return ''
+
+
+@dataclass(slots=True)
 class LatexParagraphInfo:
     """LaTeX 段落信息"""
     index: int
     text: str  # 显示文本（去掉命令）
-    raw_text: str  # 原始文本（包含命令）
     line_start: int  # 起始行号
     line_end: int  # 结束行号
     element_type: str  # heading1, heading2, body, caption, code, quote 等
     original_type: str  # 原始识别的类型
+    # 原始文本既可直接给出，也可由行列表在首次访问时拼出并缓存
+    _raw_text: Optional[str] = None
+    _raw_lines: Optional[List[str]] = None
+
+    @property
+    def raw_text(self) -> str:
+        """原始文本（包含命令），按需拼接"""
+        if self._raw_text is None:
+            self._raw_text = '\n'.join(self._raw_lines) if self._raw_lines else ''
+        return self._raw_text
 
 
-@dataclass
+@dataclass(slots=True)
 class LatexFormatGroup:
     """LaTeX 格式分组"""
     signature: str
     element_type: str
     original_type: str
-    paragraph_indices: List[int]
+    # 紧凑的 C int 数组：append/remove 接口与 list 一致，内存约为其 1/30
+    paragraph_indices: array
     sample_text: str
 
 
@@ -93,23 +158,50 @@ class LatexAnalyzer:
         r'\label', r'\ref', r'\pageref', r'\eqref',
         r'\nocite', r'\phantom', r'\hphantom', r'\vphantom',
     }
-    
+
+    # 去掉反斜杠的命令名集合：提取一次行首命令名后做 O(1) 哈希探测
+    _SKIP_NAMES = frozenset(cmd[1:] for cmd in SKIP_COMMANDS)
+    _HEADING_NAMES = {cmd[1:]: t for cmd, t in HEADING_COMMANDS.items()}
+
+
     def __init__(self):
         self.paragraphs: List[LatexParagraphInfo] = []
+        self._by_index: Dict[int, LatexParagraphInfo] = {}
         self.format_groups: Dict[str, LatexFormatGroup] = {}
         self.file_path: Optional[Path] = None
-        self.raw_content: str = ""
         self.lines: List[str] = []
-    
+
+    def _append_paragraph(self, para: LatexParagraphInfo):
+        """追加段落，维护按索引的查找表并增量归入类型分组"""
+        self.paragraphs.append(para)
+        self._by_index[para.index] = para
+        sig = para.element_type
+        group = self.format_groups.get(sig)
+        if group is None:
+            self.format_groups[sig] = LatexFormatGroup(
+                signature=sig,
+                element_type=para.element_type,
+                original_type=para.original_type,
+                paragraph_indices=array('i', (para.index,)),
+                sample_text=para.text[:50]
+            )
+        else:
+            group.paragraph_indices.append(para.index)
+
+    @property
+    def raw_content(self) -> str:
+        """原始文本（按需由行列表拼出，不再常驻一份整文副本）"""
+        return '\n'.join(self.lines)
+
     def load_document(self, file_path: str) -> bool:
         """加载 LaTeX 文档"""
         try:
             self.file_path = Path(file_path)
             with open(file_path, 'r', encoding='utf-8') as f:
-                self.raw_content = f.read()
-            self.lines = self.raw_content.split('\n')
+                # split 而非 splitlines：保留末尾换行产生的空尾元素，
+                # 使 raw_content 往返拼接与原文件逐字节一致
+                self.lines = f.read().split('\n')
             self._analyze_structure()
-            self._group_by_type()
             return True
         except Exception as e:
             print(f"加载LaTeX文档失败: {e}")
@@ -118,28 +210,50 @@ class LatexAnalyzer:
     def _analyze_structure(self):
         """分析 LaTeX 文档结构"""
         self.paragraphs = []
+        self._by_index = {}
+        self.format_groups = {}
         
         in_document = False
         current_para_lines = []
+        current_para_cleaned = []  # 与 current_para_lines 平行的逐行清理结果
         current_start_line = 0
         para_index = 0
         
-        # 环境栈：[(env_name, start_line, content_lines)]
+        # 环境栈：[(env_name, start_line, excluded_ranges)]
+        # 环境内容不再逐行收集，处理时直接按行号区间从 self.lines 切片回放；
+        # excluded_ranges 记录已被嵌套环境消费的行号区间，回放时跳过
         env_stack = []
+        skip_start = 0  # 当前跳过环境的起始行
         skip_depth = 0  # 跳过环境的嵌套深度
         
-        for i, line in enumerate(self.lines):
-            stripped = line.strip()
-            
+        # 先用 C 级的 map 批量 strip 一遍，循环体内不再逐行调用
+        lines = self.lines
+        stripped_lines = list(map(str.strip, lines))
+        
+        # 热循环内把方法与常量表绑定到局部名，省去每次迭代的属性查找
+        begin_match = _RE_BEGIN.match
+        end_match = _RE_END.match
+        heading_search = _RE_HEADING_CMD.search
+        skip_envs = self.SKIP_ENVIRONMENTS
+        transparent_envs = self.TRANSPARENT_ENVIRONMENTS
+        is_skip_command = self._is_skip_command
+        has_text_content = self._has_text_content
+        clean_latex = self._clean_latex
+        
+        for i, stripped in enumerate(stripped_lines):
+            # 每行只判一次：是否含命令、是否以命令开头（纯文本行跳过所有命令检查）
+            has_backslash = '\\' in stripped
+            is_cmd_line = has_backslash and stripped.startswith('\\')
+
             # 检查 \begin{document}
-            if r'\begin{document}' in stripped:
+            if has_backslash and r'\begin{document}' in stripped:
                 in_document = True
                 continue
-            
+
             # 检查 \end{document}
-            if r'\end{document}' in stripped:
+            if has_backslash and r'\end{document}' in stripped:
                 break
-            
+
             if not in_document:
                 continue
             
@@ -148,54 +262,58 @@ class LatexAnalyzer:
                 continue
             
             # 检查环境开始
-            env_begin = re.match(r'\\begin\{(\w+\*?)\}', stripped)
+            env_begin = begin_match(stripped) if is_cmd_line and r'\begin{' in stripped else None
             if env_begin:
                 env_name = env_begin.group(1)
                 
                 # 完全跳过的环境
-                if env_name in self.SKIP_ENVIRONMENTS:
+                if env_name in skip_envs:
+                    if skip_depth == 0:
+                        skip_start = i
                     skip_depth += 1
                     continue
                 
-                # 透明环境：收集到父环境（如果有），否则忽略
-                if env_name in self.TRANSPARENT_ENVIRONMENTS:
-                    if env_stack:
-                        env_stack[-1][2].append((i, line))
+                # 透明环境：其内容随父环境的行号区间自然保留，无需收集
+                if env_name in transparent_envs:
                     continue
                 
                 # 先保存之前的段落
                 if current_para_lines and not env_stack:
                     para_index = self._add_paragraph(para_index, current_para_lines,
-                                       current_start_line, i - 1)
+                                       current_start_line, i - 1, current_para_cleaned)
                     current_para_lines = []
+                    current_para_cleaned = []
                 
                 # 压入环境栈（包括表格、代码、公式等需要完整保留的环境）
-                env_stack.append((env_name, i, [(i, line)]))  # 包含 \begin 行
+                env_stack.append((env_name, i, []))
                 continue
             
             # 检查环境结束
-            env_end = re.match(r'\\end\{(\w+\*?)\}', stripped)
+            env_end = end_match(stripped) if is_cmd_line and r'\end{' in stripped else None
             if env_end:
                 env_name = env_end.group(1)
                 
                 # 跳过环境结束
-                if env_name in self.SKIP_ENVIRONMENTS:
+                if env_name in skip_envs:
                     skip_depth = max(0, skip_depth - 1)
+                    # 被跳过的区间同样要从父环境的切片中剔除
+                    if skip_depth == 0 and env_stack:
+                        env_stack[-1][2].append((skip_start, i))
                     continue
                 
-                # 透明环境结束：收集到父环境（如果有），否则忽略
-                if env_name in self.TRANSPARENT_ENVIRONMENTS:
-                    if env_stack:
-                        env_stack[-1][2].append((i, line))
+                # 透明环境结束：同样随父环境区间保留
+                if env_name in transparent_envs:
                     continue
                 
-                # 弹出环境栈并处理
+                # 弹出环境栈并处理（\begin 与 \end 行均在区间内）
                 if env_stack and env_stack[-1][0] == env_name:
                     env_info = env_stack.pop()
-                    env_info[2].append((i, line))  # 包含 \end 行
                     para_index = self._process_environment(
                         para_index, env_info[0], env_info[1], i, env_info[2]
                     )
+                    # 嵌套环境已单独成段，父环境回放时跳过该区间
+                    if env_stack:
+                        env_stack[-1][2].append((env_info[1], i))
                 continue
             
             # 如果在跳过的环境内，继续跳过
@@ -206,52 +324,79 @@ class LatexAnalyzer:
             if not stripped:
                 if current_para_lines and not env_stack:
                     para_index = self._add_paragraph(para_index, current_para_lines,
-                                       current_start_line, i - 1)
+                                       current_start_line, i - 1, current_para_cleaned)
                     current_para_lines = []
+                    current_para_cleaned = []
                 continue
             
             # 检查是否是纯命令行（应该跳过）
-            if self._is_skip_command(stripped):
+            if is_cmd_line and is_skip_command(stripped):
                 continue
             
-            # 如果在环境内部，收集内容
+            # 环境内部的内容已由行号区间覆盖，无需收集
             if env_stack:
-                env_stack[-1][2].append((i, line))
                 continue
             
-            # 检查标题命令
-            heading_match = None
-            for cmd in self.HEADING_COMMANDS:
-                if cmd in stripped:
-                    heading_match = cmd
-                    break
-            
+            # 检查标题命令（单次正则扫描替代逐命令子串查找）
+            hm = heading_search(stripped) if has_backslash else None
+            heading_match = hm.group(1) if hm else None
+
             if heading_match:
                 # 先保存之前的段落
                 if current_para_lines:
                     para_index = self._add_paragraph(para_index, current_para_lines,
-                                       current_start_line, i - 1)
+                                       current_start_line, i - 1, current_para_cleaned)
                     current_para_lines = []
+                    current_para_cleaned = []
                 
                 # 添加标题
-                para_index = self._add_heading_paragraph(para_index, line, i, heading_match)
+                para_index = self._add_heading_paragraph(para_index, lines[i], i, heading_match)
                 continue
             
             # 普通文本行 - 检查是否有实际内容
-            if self._has_text_content(stripped):
+            if has_text_content(stripped):
                 if not current_para_lines:
                     current_start_line = i
-                current_para_lines.append(line)
+                current_para_lines.append(lines[i])
+                # 行被收进段落时顺手清理一次，成段时无需再整体重跑正则
+                current_para_cleaned.append(clean_latex(lines[i]))
         
         # 处理最后一个段落
         if current_para_lines:
             self._add_paragraph(para_index, current_para_lines,
-                               current_start_line, len(self.lines) - 1)
+                               current_start_line, len(self.lines) - 1,
+                               current_para_cleaned)
     
+    def _iter_env_lines(self, start_line: int, end_line: int,
+                        excluded_ranges: List[Tuple[int, int]]):
+        """按行号区间回放环境内容，跳过嵌套环境已消费的区间和注释行"""
+        i = start_line
+        lines = self.lines
+        while i <= end_line:
+            for s, e in excluded_ranges:
+                if s <= i <= e:
+                    i = e + 1
+                    break
+            else:
+                line = lines[i]
+                if not line.lstrip().startswith('%'):
+                    yield i, line
+                i += 1
+
+    def _find_caption(self, content, pattern=_RE_CAPTION, literal=r'\caption'):
+        """在环境行中定位 caption，只对包含字面量的行跑正则"""
+        for _, line in content:
+            if literal in line:
+                m = pattern.search(line)
+                if m:
+                    return m.group(1)
+        return None
+
     def _process_environment(self, para_index: int, env_name: str, 
                             start_line: int, end_line: int, 
-                            content: List[Tuple[int, str]]) -> int:
+                            excluded_ranges: List[Tuple[int, int]]) -> int:
         """处理环境内容，返回更新后的 para_index"""
+        content = list(self._iter_env_lines(start_line, end_line, excluded_ranges))
         
         # 列表环境：提取每个 \item
         if env_name in self.LIST_ENVIRONMENTS:
@@ -278,105 +423,101 @@ class LatexAnalyzer:
         
         # 表格环境：完整保留
         if env_name in self.TABLE_ENVIRONMENTS:
-            raw_text = '\n'.join([line for _, line in content])
-            # 提取 caption
-            caption_match = re.search(r'\\caption\{([^}]*)\}', raw_text)
-            if caption_match:
-                display_text = f"[表格] {caption_match.group(1)}"
+            # 提取 caption（逐行定位，避免对整个环境文本跑正则）
+            caption = self._find_caption(content)
+            if caption is not None:
+                display_text = f"[表格] {caption}"
             else:
                 display_text = "[表格]"
             
             para = LatexParagraphInfo(
                 index=para_index,
                 text=display_text[:100],
-                raw_text=raw_text,
+                _raw_lines=list(map(_GET1, content)),
                 line_start=start_line,
                 line_end=end_line,
                 element_type='table',
                 original_type='table'
             )
-            self.paragraphs.append(para)
+            self._append_paragraph(para)
             return para_index + 1
         
         # 图片环境：提取 caption
         if env_name in self.FIGURE_ENVIRONMENTS:
-            raw_text = '\n'.join([line for _, line in content])
-            caption_match = re.search(r'\\caption\{([^}]*)\}', raw_text)
-            if caption_match:
-                display_text = f"[图片] {caption_match.group(1)}"
+            caption = self._find_caption(content)
+            if caption is not None:
+                display_text = f"[图片] {caption}"
                 para = LatexParagraphInfo(
                     index=para_index,
                     text=display_text[:100],
-                    raw_text=raw_text,
+                    _raw_lines=list(map(_GET1, content)),
                     line_start=start_line,
                     line_end=end_line,
                     element_type='caption',
                     original_type='caption'
                 )
-                self.paragraphs.append(para)
+                self._append_paragraph(para)
                 return para_index + 1
             return para_index
         
         # 代码环境：完整保留格式
         if env_name in self.CODE_ENVIRONMENTS:
-            raw_text = '\n'.join([line for _, line in content])
             # 提取 caption 如果有
-            caption_match = re.search(r'caption=([^,\]]+)', raw_text)
-            if caption_match:
-                display_text = f"[代码] {caption_match.group(1)}"
+            caption = self._find_caption(content, _RE_CODE_CAPTION, 'caption=')
+            if caption is not None:
+                display_text = f"[代码] {caption}"
             else:
                 # 提取前两行代码作为预览
-                code_lines = [line for _, line in content[1:-1] if line.strip()]
+                code_lines = [line for line in map(_GET1, content[1:-1]) if line.strip()]
                 preview = ' '.join(l.strip() for l in code_lines[:2])[:50]
                 display_text = f"[代码] {preview}..."
             
             para = LatexParagraphInfo(
                 index=para_index,
                 text=display_text[:100],
-                raw_text=raw_text,
+                _raw_lines=list(map(_GET1, content)),
                 line_start=start_line,
                 line_end=end_line,
                 element_type='code',
                 original_type='code'
             )
-            self.paragraphs.append(para)
+            self._append_paragraph(para)
             return para_index + 1
         
         # 公式环境：完整保留
         if env_name in self.FORMULA_ENVIRONMENTS:
-            raw_text = '\n'.join([line for _, line in content])
             # 提取公式内容作为预览
-            formula_lines = [line.strip() for _, line in content[1:-1] if line.strip()]
+            formula_lines = [line.strip() for line in map(_GET1, content[1:-1]) if line.strip()]
             preview = ' '.join(formula_lines)[:50]
             display_text = f"[公式] {preview}..."
             
             para = LatexParagraphInfo(
                 index=para_index,
                 text=display_text[:100],
-                raw_text=raw_text,
+                _raw_lines=list(map(_GET1, content)),
                 line_start=start_line,
                 line_end=end_line,
                 element_type='formula',
                 original_type='formula'
             )
-            self.paragraphs.append(para)
+            self._append_paragraph(para)
             return para_index + 1
         
         # 引用环境
         if env_name in self.CONTENT_ENVIRONMENTS:
-            raw_text = '\n'.join([line for _, line in content])
+            raw_text = '\n'.join(map(_GET1, content))
             display_text = self._clean_latex(raw_text)
             if display_text.strip():
                 para = LatexParagraphInfo(
                     index=para_index,
                     text=display_text[:100],
-                    raw_text=raw_text,
+                    _raw_text=raw_text,
                     line_start=start_line,
                     line_end=end_line,
                     element_type='quote',
                     original_type='quote'
                 )
-                self.paragraphs.append(para)
+                self._append_paragraph(para)
                 return para_index + 1
         
         return para_index
@@ -384,42 +525,42 @@ class LatexAnalyzer:
     def _add_list_item(self, para_index: int, lines: List[str], start_line: int) -> int:
         """添加列表项"""
         raw_text = '\n'.join(lines)
-        # 清理 \item 命令
-        display_text = re.sub(r'\\item\s*(\[[^\]]*\])?\s*', '', raw_text)
-        display_text = self._clean_latex(display_text)
+        # \item 及其可选标签由 _RE_CLEAN 的专属分支一并去除
+        display_text = self._clean_latex(raw_text)
         
         if display_text.strip():
             para = LatexParagraphInfo(
                 index=para_index,
                 text=display_text[:100],
-                raw_text=raw_text,
+                _raw_text=raw_text,
                 line_start=start_line,
                 line_end=start_line + len(lines) - 1,
                 element_type='body',  # 列表项当作正文
                 original_type='body'
             )
-            self.paragraphs.append(para)
+            self._append_paragraph(para)
             return para_index + 1
         return para_index
     
     def _is_skip_command(self, line: str) -> bool:
         """检查是否是应该跳过的纯命令行"""
-        # 检查是否以跳过的命令开头
-        for cmd in self.SKIP_COMMANDS:
-            if line.startswith(cmd):
+        # 行首命令名只提取一次，后续判定全部复用
+        m = _RE_CMD_NAME.match(line)
+        if m:
+            # 是否以跳过的命令开头（哈希探测）
+            if m.group(0)[1:] in self._SKIP_NAMES:
+                return True
+            # 是否是只包含格式命令的行（如 \centering、\large 单独成行），
+            # 命令名之后只剩空白即可判定，无需再跑一遍正则
+            if not line[m.end():].strip():
                 return True
-        
-        # 检查是否是只包含格式命令的行（没有实际文本）
-        # 如 \centering, \large 等单独成行
-        if re.match(r'^\\[a-zA-Z]+\s*$', line):
-            return True
         
         # 检查是否是 \xxx{} 或 \xxx[] 形式但没有可见文本
-        if re.match(r'^\\[a-zA-Z]+(\[[^\]]*\])?(\{[^}]*\})?\s*$', line):
+        if _RE_CMD_ARGS.match(line):
             # 提取可能的文本内容
-            text = re.sub(r'\\[a-zA-Z]+', '', line)
-            text = re.sub(r'\[[^\]]*\]', '', text)
-            text = re.sub(r'\{([^}]*)\}', r'\1', text)
+            text = _RE_CMD_NAME.sub('', line)
+            text = _RE_OPT_ARG.sub('', text)
+            text = _RE_BRACE_ARG.sub(r'\1', text)
             if not text.strip():
                 return True
         
@@ -428,18 +569,21 @@ class LatexAnalyzer:
     def _has_text_content(self, line: str) -> bool:
         """检查行是否包含实际文本内容"""
         # 移除所有 LaTeX 命令
-        text = re.sub(r'\\[a-zA-Z]+\*?(\[[^\]]*\])?(\{[^}]*\})?', '', line)
-        text = re.sub(r'[{}$$]', '', text)
+        text = _RE_ANY_CMD.sub('', line)
+        text = _RE_BRACE_DOLLAR.sub('', text)
         text = text.strip()
         
         # 如果清理后还有内容，则认为有文本
         return len(text) > 0
     
     def _add_paragraph(self, index: int, lines: List[str], 
-                       start_line: int, end_line: int) -> int:
+                       start_line: int, end_line: int,
+                       cleaned_lines: Optional[List[str]] = None) -> int:
         """添加普通段落，返回更新后的 para_index"""
-        raw_text = '\n'.join(lines)
-        display_text = self._clean_latex(raw_text)
+        if cleaned_lines is not None:
+            display_text = ' '.join(cleaned_lines).strip()
+        else:
+            display_text = self._clean_latex('\n'.join(lines))
         
         if not display_text.strip():
             return index
@@ -447,37 +591,45 @@ class LatexAnalyzer:
         para = LatexParagraphInfo(
             index=index,
             text=display_text[:100],
-            raw_text=raw_text,
+            _raw_lines=lines,
             line_start=start_line,
             line_end=end_line,
             element_type='body',
             original_type='body'
         )
-        self.paragraphs.append(para)
+        self._append_paragraph(para)
         return index + 1
     
     def _add_heading_paragraph(self, index: int, line: str, 
                                line_num: int, cmd: str) -> int:
         """添加标题段落，返回更新后的 para_index"""
-        # 提取标题文本
-        match = re.search(r'\\(?:sub)*(?:section|chapter|paragraph)\*?\{([^}]*)\}', line)
-        if match:
-            display_text = match.group(1)
-        else:
+        # 提取标题文本：命令名已由调用方识别，按词元直接定位花括号参数，
+        # 不再对整行重跑提取正则
+        display_text = None
+        pos = line.find('\\' + cmd)
+        if pos != -1:
+            rest = line[pos + len(cmd) + 1:]
+            if rest.startswith('*'):
+                rest = rest[1:]
+            if rest.startswith('{'):
+                end = rest.find('}', 1)
+                if end != -1:
+                    display_text = rest[1:end]
+        if display_text is None:
             display_text = self._clean_latex(line)
         
-        element_type = self.HEADING_COMMANDS.get(cmd, 'heading1')
+        element_type = self._HEADING_NAMES.get(cmd, 'heading1')
         
         para = LatexParagraphInfo(
             index=index,
             text=display_text[:100],
-            raw_text=line,
+            _raw_text=line,
             line_start=line_num,
             line_end=line_num,
             element_type=element_type,
             original_type=element_type
         )
-        self.paragraphs.append(para)
+        self._append_paragraph(para)
         return index + 1
     
     def _add_environment_paragraph(self, index: int, lines: List[str],
@@ -498,7 +650,7 @@ class LatexAnalyzer:
             
             # 图表环境特殊处理 - 尝试提取 caption
             if env_name in ['figure', 'table']:
-                caption_match = re.search(r'\\caption\{([^}]*)\}', raw_text)
+                caption_match = _RE_CAPTION.search(raw_text)
                 if caption_match:
                     display_text = f"[{env_name}] {caption_match.group(1)}"
         else:
@@ -513,58 +665,48 @@ class LatexAnalyzer:
         para = LatexParagraphInfo(
             index=index,
             text=display_text[:100],
-            raw_text=raw_text,
+            _raw_text=raw_text,
             line_start=start_line,
             line_end=end_line,
             element_type=element_type,
             original_type=element_type
         )
-        self.paragraphs.append(para)
+        self._append_paragraph(para)
         return True
     
     def _clean_latex(self, text: str) -> str:
-        """清理 LaTeX 命令，提取纯文本"""
-        # 移除常见命令
-        text = re.sub(r'\\(?:textbf|textit|emph|underline)\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\(?:section|subsection|subsubsection|chapter|paragraph)\*?\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\begin\{\w+\}', '', text)
-        text = re.sub(r'\\end\{\w+\}', '', text)
-        text = re.sub(r'\\caption\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\label\{[^}]*\}', '', text)
-        text = re.sub(r'\\ref\{[^}]*\}', '[ref]', text)
-        text = re.sub(r'\\cite\{[^}]*\}', '[cite]', text)
-        text = re.sub(r'\\\w+', '', text)  # 移除其他命令
-        text = re.sub(r'\{|\}', '', text)  # 移除花括号
-        text = re.sub(r'\s+', ' ', text)  # 合并空白
-        return text.strip()
-    
-    def _group_by_type(self):
-        """按类型分组"""
-        self.format_groups = {}
-        
-        for para in self.paragraphs:
-            sig = para.element_type
-            if sig not in self.format_groups:
-                self.format_groups[sig] = LatexFormatGroup(
-                    signature=sig,
-                    element_type=para.element_type,
-                    original_type=para.original_type,
-                    paragraph_indices=[para.index],
-                    sample_text=para.text[:50]
-                )
-            else:
-                self.format_groups[sig].paragraph_indices.append(para.index)
+        """清理 LaTeX 命令，提取纯文本（单次扫描 + 回调分派）"""
+        text = _RE_CLEAN.sub(_clean_latex_sub, text)
+        return _RE_WS.sub(' ', text).strip()
     
     def assign_type_to_paragraph(self, para_index: int, element_type: str):
-        """为指定段落分配类型"""
-        for para in self.paragraphs:
-            if para.index == para_index:
-                para.element_type = element_type
-                break
+        """为指定段落分配类型，并把它在类型分组间迁移"""
+        para = self._by_index.get(para_index)
+        if para is None or para.element_type == element_type:
+            return
+        
+        old_group = self.format_groups.get(para.element_type)
+        if old_group is not None:
+            try:
+                old_group.paragraph_indices.remove(para_index)
+            except ValueError:
+                pass
+            if not old_group.paragraph_indices:
+                del self.format_groups[para.element_type]
+        
+        para.element_type = element_type
+        new_group = self.format_groups.get(element_type)
+        if new_group is None:
+            self.format_groups[element_type] = LatexFormatGroup(
+                signature=element_type,
+                element_type=element_type,
+                original_type=para.original_type,
+                paragraph_indices=array('i', (para_index,)),
+                sample_text=para.text[:50]
+            )
+        else:
+            new_group.paragraph_indices.append(para_index)
     
     def get_paragraph_by_index(self, index: int) -> Optional[LatexParagraphInfo]:
         """根据索引获取段落"""
-        for para in self.paragraphs:
-            if para.index == index:
-                return para
-        return None
+        return self._by_index.get(index)
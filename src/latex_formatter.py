@@ -1,9 +1,12 @@
 """LaTeX 格式化模块 - 将 LaTeX 转换为 DOCX"""
 
+import copy
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from docx import Document
+from docx.oxml import OxmlElement
 from docx.shared import Pt, Cm, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
@@ -12,6 +15,227 @@ from docx.oxml.ns import qn
 from .latex_analyzer import LatexAnalyzer, LatexParagraphInfo
 from .config import DEFAULT_STYLES, FONT_SIZE_MAP
 
+# 常用限定名只解析一次（每个 run 要用到两次）
+_QN_EASTASIA = qn('w:eastAsia')
+
+
+# 文档里字号/缩进的取值集合很小，Length 对象可以整个缓存复用
+_pt = lru_cache(maxsize=256)(Pt)
+_cm = lru_cache(maxsize=256)(Cm)
+_QN_ASCII = qn('w:ascii')
+_QN_HANSI = qn('w:hAnsi')
+_QN_VAL = qn('w:val')
+_QN_XML_SPACE = qn('xml:space')
+_QN_FIRSTLINE = qn('w:firstLine')
+_QN_LEFT = qn('w:left')
+
+
+def _build_run_rpr(font_en: str, font_cn: str, sz_val: str):
+    """构造一份 run 属性模板，调用方 deepcopy 后插入 run"""
+    rPr = OxmlElement('w:rPr')
+    rFonts = OxmlElement('w:rFonts')
+    rFonts.set(_QN_ASCII, font_en)
+    rFonts.set(_QN_HANSI, font_en)
+    rFonts.set(_QN_EASTASIA, font_cn)
+    sz = OxmlElement('w:sz')
+    sz.set(_QN_VAL, sz_val)
+    rPr.append(rFonts)
+    rPr.append(sz)
+    return rPr
+
+
+# 表格单元格统一用 Times New Roman/宋体 10.5pt，模板构建一次
+_CELL_RPR_TEMPLATE = _build_run_rpr('Times New Roman', '宋体', '21')
+
+# 代码块左缩进 0.5cm 对应的 twips 值
+_CODE_LEFT_TWIPS = str(Cm(0.5).twips)
+
+
+def _apply_run_fonts(run, font_en: str, font_cn: str, size_pt: float,
+                     bold: bool = False, italic: bool = False):
+    """直接写 run 的 rPr 子节点，替代多次属性赋值触发的重复 XML 查找"""
+    rPr = run._element.get_or_add_rPr()
+    rFonts = OxmlElement('w:rFonts')
+    rFonts.set(_QN_ASCII, font_en)
+    rFonts.set(_QN_HANSI, font_en)
+    rFonts.set(_QN_EASTASIA, font_cn)
+    rPr.append(rFonts)
+    if bold:
+        rPr.append(OxmlElement('w:b'))
+    if italic:
+        rPr.append(OxmlElement('w:i'))
+    sz = OxmlElement('w:sz')
+    sz.set(_QN_VAL, str(int(size_pt * 2)))
+    rPr.append(sz)
+
+# 预编译的清理管线（与 latex_analyzer 一致：模式常驻模块级，
+# 每段落的热路径不再重复经过 re 模块的缓存查找）
+_CLEAN_DOCX_PRE = (
+    # 移除环境标记
+    (re.compile(r'\\begin\{\w+\*?\}(\[.*?\])?'), ''),
+    (re.compile(r'\\end\{\w+\*?\}'), ''),
+    # 提取标题内容
+    (re.compile(r'\\(?:sub)*(?:section|chapter|paragraph)\*?\{([^}]*)\}'), r'\1'),
+    # 提取网址 - 保留 URL 内容
+    (re.compile(r'\\url\{([^}]*)\}'), r'\1'),
+    (re.compile(r'\\href\{([^}]*)\}\{([^}]*)\}'), r'\2 (\1)'),  # 显示文字 (网址)
+    # 提取格式命令内容
+    (re.compile(r'\\(?:textbf|textit|emph|underline|textrm|textsf|texttt)\{([^}]*)\}'), r'\1'),
+    # 提取 caption 内容
+    (re.compile(r'\\caption\{([^}]*)\}'), r'\1'),
+    # 移除 \item 标记
+    (re.compile(r'\\item\s*(\[[^\]]*\])?\s*'), ''),
+)
+
+# 引用和标签的形态固定，走 str.find 扫描（见 _replace_ref_commands）
+_CLEAN_DOCX_POST = (
+    # 移除其他常见命令
+    (re.compile(r'\\(?:centering|raggedright|raggedleft|noindent|par)\b'), ''),
+    (re.compile(r'\\(?:vspace|hspace)\*?\{[^}]*\}'), ''),
+    (re.compile(r'\\(?:small|large|Large|LARGE|huge|Huge|tiny|footnotesize|scriptsize|normalsize)\b'), ''),
+    # 移除剩余的简单命令（但保留 $...$）
+    (re.compile(r'\\[a-zA-Z]+\*?(\{[^}]*\})?'), ''),
+    # 清理多余的大括号
+    (re.compile(r'[{}]'), ''),
+)
+
+_CLEAN_CELL_PIPELINE = (
+    # 移除 \textbf 等格式命令，保留内容
+    (re.compile(r'\\textbf\{([^}]*)\}'), r'\1'),
+    (re.compile(r'\\textit\{([^}]*)\}'), r'\1'),
+    (re.compile(r'\\texttt\{([^}]*)\}'), r'\1'),
+    (re.compile(r'\\emph\{([^}]*)\}'), r'\1'),
+    # 移除其他命令
+    (re.compile(r'\\[a-zA-Z]+\{([^}]*)\}'), r'\1'),
+    (re.compile(r'\\[a-zA-Z]+(?![_])'), ''),  # 不匹配 \_
+    (re.compile(r'[{}]'), ''),
+)
+
+# 公式符号的字面映射：一次备选式扫描 + 字典查表，替代逐符号的整串替换
+_LATEX_SYMBOL_MAP = {
+    'times': '×', 'div': '÷', 'pm': '±',
+    'leq': '≤', 'geq': '≥', 'neq': '≠', 'approx': '≈', 'infty': '∞',
+    'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ',
+    'sum': '∑', 'prod': '∏', 'int': '∫',
+    'log': 'log', 'ln': 'ln', 'sin': 'sin', 'cos': 'cos', 'tan': 'tan',
+}
+_RE_LATEX_SYMBOL = re.compile(
+    r'\\(' + '|'.join(sorted(_LATEX_SYMBOL_MAP, key=len, reverse=True)) + r')(?![a-zA-Z])')
+_RE_SQRT = re.compile(r'\\sqrt\{([^}]*)\}')
+_RE_FRAC = re.compile(r'\\frac\{([^}]*)\}\{([^}]*)\}')
+_RE_ANY_CMD = re.compile(r'\\[a-zA-Z]+')
+_RE_BRACES = re.compile(r'[{}]')
+
+# 表格解析相关
+_RE_TABLE_CAPTION = re.compile(r'\\caption\{([^}]*)\}')
+_RE_TABULAR = re.compile(r'\\begin\{tabular\}\{[^}]*\}(.*?)\\end\{tabular\}', re.DOTALL)
+_RE_TABLE_RULES = re.compile(r'\\(?:toprule|midrule|bottomrule|hline|cline\{[^}]*\})\s*')
+
+# 标题编号用的数字字符串全部在导入时算好，热路径只做一次索引
+_CHINESE_NUMS = ('零', '一', '二', '三', '四', '五', '六', '七', '八', '九', '十',
+                 '十一', '十二', '十三', '十四', '十五', '十六', '十七', '十八', '十九', '二十')
+
+
+def _chinese_number(num: int) -> str:
+    if 0 <= num <= 20:
+        return _CHINESE_NUMS[num]
+    tens, ones = divmod(num, 10)
+    if ones == 0:
+        return f"{_CHINESE_NUMS[tens]}十"
+    return f"{_CHINESE_NUMS[tens]}十{_CHINESE_NUMS[ones]}"
+
+
+_CHINESE_0_99 = tuple(_chinese_number(i) for i in range(100))
+_CIRCLED_NUMS = ('⓪', '①', '②', '③', '④', '⑤', '⑥', '⑦', '⑧', '⑨', '⑩',
+                 '⑪', '⑫', '⑬', '⑭', '⑮', '⑯', '⑰', '⑱', '⑲', '⑳')
+
+_RE_WS = re.compile(r'\s+')
+# LaTeX 转义字符：全部是反斜杠加单字符，一次扫描全部还原
+_RE_UNESCAPE = re.compile(r'\\([_%&#~^{}$])')
+_RE_HEADING_ARG = re.compile(r'\\(?:sub)*(?:section|chapter|paragraph)\*?\{([^}]*)\}')
+_RE_ENV_BLOCK = re.compile(r'\\begin\{(\w+)\}(.*?)\\end\{\1\}', re.DOTALL)
+
+_UNESCAPE_SUB = _RE_UNESCAPE.sub
+
+
+# 热路径清理函数放在模块层：纯函数调用，没有实例绑定与属性查找开销
+def _unescape_latex(text: str) -> str:
+    """处理 LaTeX 转义字符（\_、\%、\& 等，单次扫描还原）"""
+    return _UNESCAPE_SUB(r'\1', text)
+
+
+def _clean_cell(text: str) -> str:
+    """清理表格单元格内容"""
+    for pat, repl in _CLEAN_CELL_PIPELINE:
+        text = pat.sub(repl, text)
+    # 处理转义字符
+    text = _unescape_latex(text)
+    return text.strip()
+
+
+def _replace_ref_commands(text: str) -> str:
+    """移除引用和标签：\label/\ref/\cite 形态固定，用 str.find 扫描替换"""
+    for token, repl in (('\\label{', ''), ('\\ref{', '[ref]'), ('\\cite{', '[cite]')):
+        start = text.find(token)
+        if start == -1:
+            continue
+        out = []
+        pos = 0
+        while start != -1:
+            end = text.find('}', start + len(token))
+            if end == -1:
+                break
+            out.append(text[pos:start])
+            out.append(repl)
+            pos = end + 1
+            start = text.find(token, pos)
+        out.append(text[pos:])
+        text = ''.join(out)
+    return text
+
+
+def _fast_inline_split(text: str) -> List[str]:
+    """按行内公式 $...$ 切分文本，保留公式段；str.find 扫描代替正则切分"""
+    parts = []
+    pos = 0        # 已输出到的位置
+    search = 0     # 下一次查找 $ 的起点
+    find = text.find
+    while True:
+        i = find('$', search)
+        if i == -1:
+            break
+        j = find('$', i + 1)
+        if j == -1:
+            break
+        if j == i + 1:
+            # 空公式 $$：左侧 $ 按普通字符处理，继续向后找
+            search = i + 1
+            continue
+        parts.append(text[pos:i])
+        parts.append(text[i:j + 1])
+        pos = search = j + 1
+    parts.append(text[pos:])
+    return parts
+
+
+def _clean_latex_for_docx(text: str) -> str:
+    """清理 LaTeX 命令，提取纯文本用于 DOCX 输出"""
+    # 纯文本段落（无命令、无花括号）整条管线都是空转，直接归一化空白返回
+    if '\\' not in text and '{' not in text and '}' not in text:
+        return ' '.join(text.split())
+    for pat, repl in _CLEAN_DOCX_PRE:
+        text = pat.sub(repl, text)
+    text = _replace_ref_commands(text)
+    for pat, repl in _CLEAN_DOCX_POST:
+        text = pat.sub(repl, text)
+    
+    # 处理 LaTeX 转义字符 - 必须在清理命令之后
+    text = _unescape_latex(text)
+    
+    text = _RE_WS.sub(' ', text)
+    
+    return text.strip()
+
 
 class LatexToDocxConverter:
     """LaTeX 到 DOCX 转换器 - 完全使用传入的样式配置"""
@@ -25,6 +249,9 @@ class LatexToDocxConverter:
         # 表格和代码计数器
         self.table_counter = 0
         self.code_counter = 0
+        # 按类型缓存解析后的样式元组，同类型段落不再重复取值
+        self._style_cache: Dict[str, tuple] = {}
+        self._caption_style: Optional[tuple] = None
     
     def convert(self, paragraph_mappings: Dict[int, str] = None,
                 progress_callback=None) -> Document:
@@ -34,7 +261,10 @@ class LatexToDocxConverter:
         
         paragraph_mappings = paragraph_mappings or {}
         total = len(self.analyzer.paragraphs)
-        
+        # 进度最多汇报 80 次：到达下一个阈值才回调，长文档不再每 10 段取模
+        step = max(1, total // 80)
+        next_tick = 0
+
         for i, para in enumerate(self.analyzer.paragraphs):
             # 确定段落类型：优先使用用户修改的，否则使用原始类型
             if para.index in paragraph_mappings:
@@ -56,18 +286,44 @@ class LatexToDocxConverter:
                 self._add_formula(para.raw_text)
             else:
                 # 普通文本：清理后输出，处理行内公式
-                full_text = self._clean_latex_for_docx(para.raw_text)
+                full_text = _clean_latex_for_docx(para.raw_text)
                 self._add_paragraph_with_style(full_text, element_type)
             
-            if progress_callback and i % 10 == 0:
+            if progress_callback and i >= next_tick:
                 progress = 10 + int(80 * i / total)
                 progress_callback(progress, f"转换中... {i}/{total}")
+                next_tick = i + step
         
         if progress_callback:
             progress_callback(95, "完成转换")
         
         return self.doc
     
+    def _resolve_style(self, element_type: str) -> tuple:
+        """按类型解析样式，结果缓存；同类型段落只取值一次"""
+        cached = self._style_cache.get(element_type)
+        if cached is not None:
+            return cached
+        
+        is_heading = element_type.startswith('heading')
+        if is_heading:
+            style = self.styles.get(element_type, self.styles.get('body', {}))
+        else:
+            style = self.styles.get('body', {})
+        
+        resolved = (
+            style.get('font_name_cn') or style.get('font_cn', '宋体'),
+            style.get('font_name_en') or style.get('font_en', 'Times New Roman'),
+            self._get_font_size_pt(style.get('font_size', '小四')),
+            style.get('bold', False),
+            0 if is_heading else style.get('first_line_indent', 2),
+            style.get('line_spacing_type', '倍数行距'),
+            style.get('line_spacing_value', 1.5),
+            style.get('alignment', 'left'),
+        )
+        self._style_cache[element_type] = resolved
+        return resolved
+    
     def _add_paragraph_with_style(self, text: str, element_type: str):
         """根据类型添加段落并应用左侧面板的样式，处理行内公式"""
         p = self.doc.add_paragraph()
@@ -78,21 +334,13 @@ class LatexToDocxConverter:
             numbered_text = self._get_heading_number(level) + text
             text = numbered_text
         
-        # 获取对应类型的样式
-        if element_type.startswith('heading'):
-            style = self.styles.get(element_type, self.styles.get('body', {}))
-        else:
-            style = self.styles.get('body', {})
-        
-        # 字体设置
-        font_cn = style.get('font_name_cn') or style.get('font_cn', '宋体')
-        font_en = style.get('font_name_en') or style.get('font_en', 'Times New Roman')
-        font_size = style.get('font_size', '小四')
-        size_pt = self._get_font_size_pt(font_size)
-        is_bold = style.get('bold', False)
+        # 样式取值（含字号换算）已按类型缓存
+        (font_cn, font_en, size_pt, is_bold,
+         indent, line_type, line_value, align) = self._resolve_style(element_type)
         
         # 处理行内公式 $...$：分割文本，交替处理普通文本和公式
-        parts = re.split(r'(\$[^$]+\$)', text)
+        # 绝大多数段落没有行内公式，先用子串检查挡掉正则调用
+        parts = _fast_inline_split(text) if '$' in text else (text,)
         
         for part in parts:
             if not part:
@@ -102,37 +350,26 @@ class LatexToDocxConverter:
                 # 行内公式：用斜体表示
                 formula_text = part[1:-1]  # 去掉 $ 符号
                 # 清理公式中的转义字符
-                formula_text = self._unescape_latex(formula_text)
+                formula_text = _unescape_latex(formula_text)
                 run = p.add_run(formula_text)
-                run.font.name = 'Cambria Math'
-                run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
-                run.font.italic = True
-                run.font.size = Pt(size_pt)
+                _apply_run_fonts(run, 'Cambria Math', font_cn, size_pt, italic=True)
             else:
                 # 普通文本 - 处理转义字符
-                clean_text = self._unescape_latex(part)
+                clean_text = _unescape_latex(part)
                 run = p.add_run(clean_text)
-                run.font.name = font_en
-                run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
-                run.font.bold = is_bold
-                run.font.size = Pt(size_pt)
+                _apply_run_fonts(run, font_en, font_cn, size_pt, bold=is_bold)
         
         # 首行缩进（正文类型才有）
-        if not element_type.startswith('heading'):
-            indent = style.get('first_line_indent', 2)
-            if indent:
-                p.paragraph_format.first_line_indent = Cm(indent * 0.35)
+        if indent:
+            p.paragraph_format.first_line_indent = _cm(indent * 0.35)
         
         # 行距
-        line_type = style.get('line_spacing_type', '倍数行距')
-        line_value = style.get('line_spacing_value', 1.5)
         if line_type == '固定值':
-            p.paragraph_format.line_spacing = Pt(line_value)
+            p.paragraph_format.line_spacing = _pt(line_value)
         else:
             p.paragraph_format.line_spacing = line_value
         
         # 对齐方式
-        align = style.get('alignment', 'left')
         if align == 'center':
             p.alignment = WD_ALIGN_PARAGRAPH.CENTER
         elif align == 'right':
@@ -183,85 +420,71 @@ class LatexToDocxConverter:
             return f"{self._to_circled_number(self.heading_counters[4])}"
     
     def _to_chinese_number(self, num: int) -> str:
-        """将数字转换为中文数字"""
-        chinese_nums = ['零', '一', '二', '三', '四', '五', '六', '七', '八', '九', '十',
-                       '十一', '十二', '十三', '十四', '十五', '十六', '十七', '十八', '十九', '二十']
-        if 0 <= num <= 20:
-            return chinese_nums[num]
-        elif num < 100:
-            tens = num // 10
-            ones = num % 10
-            if ones == 0:
-                return f"{chinese_nums[tens]}十"
-            else:
-                return f"{chinese_nums[tens]}十{chinese_nums[ones]}"
+        """将数字转换为中文数字（0-99 预先算好）"""
+        if 0 <= num < 100:
+            return _CHINESE_0_99[num]
         return str(num)
     
     def _to_circled_number(self, num: int) -> str:
         """将数字转换为带圈数字 ①②③..."""
-        circled = ['⓪', '①', '②', '③', '④', '⑤', '⑥', '⑦', '⑧', '⑨', '⑩',
-                   '⑪', '⑫', '⑬', '⑭', '⑮', '⑯', '⑰', '⑱', '⑲', '⑳']
         if 0 <= num <= 20:
-            return circled[num]
+            return _CIRCLED_NUMS[num]
         return f"({num})"
     
     def _add_caption(self, text: str):
         """添加图表/代码标题，使用 caption 样式，上下各有一个空行"""
-        # 获取 caption 样式
-        style = self.styles.get('caption', {})
-        font_cn = style.get('font_name_cn') or style.get('font_cn', '宋体')
-        font_en = style.get('font_name_en') or style.get('font_en', 'Times New Roman')
-        font_size = style.get('font_size', '小五')
-        size_pt = self._get_font_size_pt(font_size)
+        # caption 样式在一次转换中不会变，取值结果缓存在实例上
+        cached = self._caption_style
+        if cached is None:
+            style = self.styles.get('caption', {})
+            font_cn = style.get('font_name_cn') or style.get('font_cn', '宋体')
+            font_en = style.get('font_name_en') or style.get('font_en', 'Times New Roman')
+            size_pt = self._get_font_size_pt(style.get('font_size', '小五'))
+            cached = self._caption_style = (font_cn, font_en, size_pt, _pt(size_pt))
+        font_cn, font_en, size_pt, size_length = cached
         
         # 上方空行
         p_before = self.doc.add_paragraph()
         run_before = p_before.add_run()
-        run_before.font.size = Pt(size_pt)
+        run_before.font.size = size_length
         
         # 标题行
         p = self.doc.add_paragraph()
         run = p.add_run(text)
-        run.font.name = font_en
-        run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
-        run.font.size = Pt(size_pt)
+        _apply_run_fonts(run, font_en, font_cn, size_pt)
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
         
         # 下方空行
         p_after = self.doc.add_paragraph()
         run_after = p_after.add_run()
-        run_after.font.size = Pt(size_pt)
+        run_after.font.size = size_length
     
     def _add_table(self, raw_text: str):
         """解析 LaTeX 表格并创建 DOCX 表格"""
         # 提取 caption（稍后在表格下方添加）
-        caption_match = re.search(r'\\caption\{([^}]*)\}', raw_text)
+        caption_match = _RE_TABLE_CAPTION.search(raw_text)
         caption_text = None
         if caption_match:
-            caption_text = self._clean_cell(caption_match.group(1))
+            caption_text = _clean_cell(caption_match.group(1))
         
         # 提取 tabular 内容
-        tabular_match = re.search(r'\\begin\{tabular\}\{[^}]*\}(.*?)\\end\{tabular\}', raw_text, re.DOTALL)
+        tabular_match = _RE_TABULAR.search(raw_text)
         if not tabular_match:
             # 如果没有 tabular，尝试其他格式
             return
         
-        tabular_content = tabular_match.group(1)
-        
         # 先移除 \toprule, \midrule, \bottomrule, \hline, \cline 等规则
-        tabular_content = re.sub(r'\\(?:toprule|midrule|bottomrule|hline|cline\{[^}]*\})\s*', '', tabular_content)
+        tabular_content = _RE_TABLE_RULES.sub('', tabular_match.group(1))
         
-        # 解析表格行（按 \\ 分割，但要注意 \\ 在 LaTeX 中是换行）
-        rows_raw = re.split(r'\s*\\\\\s*', tabular_content)
+        # 解析表格行：换行符 \\ 是固定字面量，str.split 一次扫完即可
         rows = []
-        for row in rows_raw:
-            row = row.strip()
-            if not row:
-                continue
-            # 按 & 分割单元格
-            cells = [self._clean_cell(c.strip()) for c in row.split('&')]
-            if any(c for c in cells):  # 至少有一个非空单元格
-                rows.append(cells)
+        for chunk in tabular_content.split('\\\\'):
+            chunk = chunk.strip()
+            if chunk:
+                # 按 & 分割单元格
+                cells = [_clean_cell(c.strip()) for c in chunk.split('&')]
+                if any(c for c in cells):  # 至少有一个非空单元格
+                    rows.append(cells)
         
         if not rows:
             return
@@ -277,12 +500,11 @@ class LatexToDocxConverter:
                 if j < num_cols:
                     cell = row_obj.cells[j]
                     cell.text = cell_text
-                    # 设置单元格字体
+                    # 设置单元格字体：整份 rPr 模板一次插入，
+                    # 免去逐属性经过 python-docx 描述符的开销
                     for paragraph in cell.paragraphs:
                         for run in paragraph.runs:
-                            run.font.name = 'Times New Roman'
-                            run._element.rPr.rFonts.set(qn('w:eastAsia'), '宋体')
-                            run.font.size = Pt(10.5)
+                            run._element.insert(0, copy.deepcopy(_CELL_RPR_TEMPLATE))
         
         # 在表格下方添加 caption（类似 "表1 xxx" 格式），使用 caption 样式
         if caption_text:
@@ -294,18 +516,7 @@ class LatexToDocxConverter:
     
     def _clean_cell(self, text: str) -> str:
         """清理表格单元格内容"""
-        # 移除 \textbf 等格式命令，保留内容
-        text = re.sub(r'\\textbf\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\textit\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\texttt\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\emph\{([^}]*)\}', r'\1', text)
-        # 移除其他命令
-        text = re.sub(r'\\[a-zA-Z]+\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\[a-zA-Z]+(?![_])', '', text)  # 不匹配 \_
-        text = re.sub(r'[{}]', '', text)
-        # 处理转义字符
-        text = self._unescape_latex(text)
-        return text.strip()
+        return _clean_cell(text)
     
     def _add_code_block(self, raw_text: str):
         """添加代码块，保持格式"""
@@ -322,25 +533,34 @@ class LatexToDocxConverter:
         caption_match = re.search(r'caption=([^,\]]+)', raw_text)
         caption_text = None
         if caption_match:
-            caption_text = self._unescape_latex(caption_match.group(1).strip())
+            caption_text = _unescape_latex(caption_match.group(1).strip())
         
         # 获取代码样式
         code_style = self.styles.get('code', {})
         code_font = code_style.get('font_name', 'Consolas')
         code_size = self._get_font_size_pt(code_style.get('font_size', '小五'))
         
+        # 段落/run 属性模板各构建一次，逐行 deepcopy 插入，
+        # 长代码块不再按行走 python-docx 的描述符赋值
+        rpr_template = _build_run_rpr(code_font, '等线', str(int(code_size * 2)))
+        ppr_template = OxmlElement('w:pPr')
+        ind = OxmlElement('w:ind')
+        ind.set(_QN_FIRSTLINE, '0')  # 不缩进
+        ind.set(_QN_LEFT, _CODE_LEFT_TWIPS)
+        ppr_template.append(ind)
+        
         # 按行添加代码，保持缩进
         for line in code_content.split('\n'):
             if line.strip() or line:  # 保留空行
-                p = self.doc.add_paragraph()
-                run = p.add_run(line.rstrip())
-                # 使用等宽字体
-                run.font.name = code_font
-                run._element.rPr.rFonts.set(qn('w:eastAsia'), '等线')
-                run.font.size = Pt(code_size)
-                # 不缩进
-                p.paragraph_format.first_line_indent = Pt(0)
-                p.paragraph_format.left_indent = Cm(0.5)
+                p_el = self.doc.add_paragraph()._p
+                p_el.append(copy.deepcopy(ppr_template))
+                r_el = OxmlElement('w:r')
+                r_el.append(copy.deepcopy(rpr_template))
+                t_el = OxmlElement('w:t')
+                t_el.text = line.rstrip()
+                t_el.set(_QN_XML_SPACE, 'preserve')
+                r_el.append(t_el)
+                p_el.append(r_el)
         
         # 在代码块下方添加 caption（类似 "代码1 xxx" 格式），使用 caption 样式
         if caption_text:
@@ -372,33 +592,15 @@ class LatexToDocxConverter:
     
     def _clean_formula(self, text: str) -> str:
         """清理公式内容，转换为 Word 可识别的格式"""
-        # 移除 LaTeX 特殊命令，保留数学符号
-        text = re.sub(r'\\times', '×', text)
-        text = re.sub(r'\\div', '÷', text)
-        text = re.sub(r'\\pm', '±', text)
-        text = re.sub(r'\\leq', '≤', text)
-        text = re.sub(r'\\geq', '≥', text)
-        text = re.sub(r'\\neq', '≠', text)
-        text = re.sub(r'\\approx', '≈', text)
-        text = re.sub(r'\\infty', '∞', text)
-        text = re.sub(r'\\alpha', 'α', text)
-        text = re.sub(r'\\beta', 'β', text)
-        text = re.sub(r'\\gamma', 'γ', text)
-        text = re.sub(r'\\delta', 'δ', text)
-        text = re.sub(r'\\sum', '∑', text)
-        text = re.sub(r'\\prod', '∏', text)
-        text = re.sub(r'\\int', '∫', text)
-        text = re.sub(r'\\sqrt\{([^}]*)\}', r'√(\1)', text)
-        text = re.sub(r'\\frac\{([^}]*)\}\{([^}]*)\}', r'(\1)/(\2)', text)
-        text = re.sub(r'\\log', 'log', text)
-        text = re.sub(r'\\ln', 'ln', text)
-        text = re.sub(r'\\sin', 'sin', text)
-        text = re.sub(r'\\cos', 'cos', text)
-        text = re.sub(r'\\tan', 'tan', text)
+        # 带参数的命令先展开
+        text = _RE_SQRT.sub(r'√(\1)', text)
+        text = _RE_FRAC.sub(r'(\1)/(\2)', text)
+        # 字面符号一次扫描替换
+        text = _RE_LATEX_SYMBOL.sub(lambda m: _LATEX_SYMBOL_MAP[m.group(1)], text)
         # 移除剩余的反斜杠命令
-        text = re.sub(r'\\[a-zA-Z]+', '', text)
-        text = re.sub(r'[{}]', '', text)
-        text = re.sub(r'\s+', ' ', text)
+        text = _RE_ANY_CMD.sub('', text)
+        text = _RE_BRACES.sub('', text)
+        text = _RE_WS.sub(' ', text)
         return text.strip()
     
     def _insert_omml_formula(self, paragraph, formula_text: str):
@@ -426,67 +628,11 @@ class LatexToDocxConverter:
     
     def _clean_latex_for_docx(self, text: str) -> str:
         """清理 LaTeX 命令，提取纯文本用于 DOCX 输出"""
-        # 移除环境标记
-        text = re.sub(r'\\begin\{\w+\*?\}(\[.*?\])?', '', text)
-        text = re.sub(r'\\end\{\w+\*?\}', '', text)
-        
-        # 提取标题内容
-        text = re.sub(r'\\(?:sub)*(?:section|chapter|paragraph)\*?\{([^}]*)\}', r'\1', text)
-        
-        # 提取网址 - 保留 URL 内容
-        text = re.sub(r'\\url\{([^}]*)\}', r'\1', text)
-        text = re.sub(r'\\href\{([^}]*)\}\{([^}]*)\}', r'\2 (\1)', text)  # 显示文字 (网址)
-        
-        # 提取格式命令内容
-        text = re.sub(r'\\(?:textbf|textit|emph|underline|textrm|textsf|texttt)\{([^}]*)\}', r'\1', text)
-        
-        # 提取 caption 内容
-        text = re.sub(r'\\caption\{([^}]*)\}', r'\1', text)
-        
-        # 移除 \item 标记
-        text = re.sub(r'\\item\s*(\[[^\]]*\])?\s*', '', text)
-        
-        # 移除引用和标签
-        text = re.sub(r'\\label\{[^}]*\}', '', text)
-        text = re.sub(r'\\ref\{[^}]*\}', '[ref]', text)
-        text = re.sub(r'\\cite\{[^}]*\}', '[cite]', text)
-        
-        # 移除其他常见命令
-        text = re.sub(r'\\(?:centering|raggedright|raggedleft|noindent|par)\b', '', text)
-        text = re.sub(r'\\(?:vspace|hspace)\*?\{[^}]*\}', '', text)
-        text = re.sub(r'\\(?:small|large|Large|LARGE|huge|Huge|tiny|footnotesize|scriptsize|normalsize)\b', '', text)
-        
-        # 移除剩余的简单命令（但保留 $...$）
-        text = re.sub(r'\\[a-zA-Z]+\*?(\{[^}]*\})?', '', text)
-        
-        # 清理多余的大括号
-        text = re.sub(r'[{}]', '', text)
-        
-        # 处理 LaTeX 转义字符 - 必须在清理命令之后
-        text = self._unescape_latex(text)
-        
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        return _clean_latex_for_docx(text)
     
     def _unescape_latex(self, text: str) -> str:
-        """处理 LaTeX 转义字符"""
-        # 注意：这里使用字面字符串，不是正则表达式
-        # LaTeX 转义字符在文本中的形式
-        escapes = [
-            ('\\_', '_'),   # 下划线
-            ('\\%', '%'),   # 百分号
-            ('\\&', '&'),   # 与号
-            ('\\#', '#'),   # 井号
-            ('\\~', '~'),   # 波浪号
-            ('\\^', '^'),   # 脱字符
-            ('\\{', '{'),   # 左大括号
-            ('\\}', '}'),   # 右大括号
-            ('\\$', '$'),   # 美元符号
-        ]
-        for latex, char in escapes:
-            text = text.replace(latex, char)
-        return text
+        """处理 LaTeX 转义字符（\_、\%、\& 等，单次扫描还原）"""
+        return _unescape_latex(text)
 
 
 def convert_latex_to_docx(input_file: str, output_file: str,
@@ -554,7 +700,14 @@ class LatexFormatter:
     def __init__(self, analyzer: LatexAnalyzer):
         self.analyzer = analyzer
         self.lines = analyzer.lines.copy()
-    
+        # 非标题类型的分发表：热路径上一次字典查找代替逐个字符串比较
+        self._formatters = {
+            'body': self._format_as_body,
+            'caption': self._format_as_caption,
+            'code': self._format_as_code,
+            'quote': self._format_as_quote,
+        }
+
     def apply_format(self, paragraph_mappings: Dict[int, str],
                      styles: Dict[str, Any] = None,
                      progress_callback=None) -> str:
@@ -571,59 +724,57 @@ class LatexFormatter:
         if progress_callback:
             progress_callback(10, "分析修改内容...")
         
-        # 按行号倒序处理，避免行号偏移
         modifications = []
         for para_idx, target_type in paragraph_mappings.items():
             para = self.analyzer.get_paragraph_by_index(para_idx)
             if para:
-                modifications.append((para, target_type, styles))
+                modifications.append((para, target_type))
         
-        # 按起始行号倒序排序
-        modifications.sort(key=lambda x: x[0].line_start, reverse=True)
+        # 按起始行号升序排序，最后做一次线性拼接，
+        # 不再对 self.lines 做逐段的切片赋值（每次都要搬移尾部）
+        modifications.sort(key=lambda x: x[0].line_start)
         
         total = len(modifications)
         processed = 0
-        
-        for para, target_type, styles in modifications:
-            self._modify_paragraph(para, target_type, styles)
+        # 与 convert 相同的节流：进度最多汇报 80 次
+        step = max(1, total // 80)
+        next_tick = step
+
+        out = []
+        cursor = 0
+        for para, target_type in modifications:
+            new_content = self._render_paragraph(para, target_type, styles)
+            out.extend(self.lines[cursor:para.line_start])
+            out.extend(new_content.split('\n'))
+            cursor = para.line_end + 1
             processed += 1
-            if progress_callback and total > 0:
+            if progress_callback and processed >= next_tick:
                 prog = 10 + int(80 * processed / total)
                 progress_callback(prog, f"修改段落 {processed}/{total}")
+                next_tick = processed + step
+        out.extend(self.lines[cursor:])
+        self.lines = out
         
         if progress_callback:
             progress_callback(95, "生成输出...")
         
         return '\n'.join(self.lines)
     
-    def _modify_paragraph(self, para: LatexParagraphInfo, 
-                          target_type: str, styles: Dict[str, Any]):
-        """修改单个段落"""
+    def _render_paragraph(self, para: LatexParagraphInfo, 
+                          target_type: str, styles: Dict[str, Any]) -> str:
+        """生成单个段落的新内容（不改动 self.lines）"""
         style = styles.get(target_type, {}) if styles else {}
         
         # 获取原始行
-        start = para.line_start
-        end = para.line_end
-        original_lines = self.lines[start:end + 1]
-        original_text = '\n'.join(original_lines)
+        original_text = '\n'.join(self.lines[para.line_start:para.line_end + 1])
         
         # 根据目标类型生成新内容
         if target_type.startswith('heading'):
-            new_content = self._format_as_heading(original_text, para, target_type, style)
-        elif target_type == 'body':
-            new_content = self._format_as_body(original_text, para, style)
-        elif target_type == 'caption':
-            new_content = self._format_as_caption(original_text, para, style)
-        elif target_type == 'code':
-            new_content = self._format_as_code(original_text, para, style)
-        elif target_type == 'quote':
-            new_content = self._format_as_quote(original_text, para, style)
-        else:
-            new_content = original_text
-        
-        # 替换行
-        new_lines = new_content.split('\n')
-        self.lines[start:end + 1] = new_lines
+            return self._format_as_heading(original_text, para, target_type, style)
+        fmt = self._formatters.get(target_type)
+        if fmt:
+            return fmt(original_text, para, style)
+        return original_text
     
     def _format_as_heading(self, text: str, para: LatexParagraphInfo,
                            target_type: str, style: dict) -> str:
@@ -702,18 +853,18 @@ class LatexFormatter:
         """从原始文本中提取内容"""
         # 如果是标题，提取花括号内的内容
         if original_type.startswith('heading'):
-            match = re.search(r'\\(?:sub)*(?:section|chapter|paragraph)\*?\{([^}]*)\}', text)
+            match = _RE_HEADING_ARG.search(text)
             if match:
                 return match.group(1)
         
         # 如果是环境，提取环境内容
-        env_match = re.match(r'\\begin\{(\w+)\}(.*?)\\end\{\1\}', text, re.DOTALL)
+        env_match = _RE_ENV_BLOCK.match(text)
         if env_match:
             return env_match.group(2).strip()
         
         # 否则返回清理后的文本
         # 移除标题命令
-        text = re.sub(r'\\(?:sub)*(?:section|chapter|paragraph)\*?\{([^}]*)\}', r'\1', text)
+        text = _RE_HEADING_ARG.sub(r'\1', text)
         return text.strip()
     
     def save(self, output_path: str, content: str = None):
@@ -2,11 +2,14 @@
 
 import re
 import os
+import copy
 import base64
+import asyncio
+import hashlib
 from pathlib import Path
 from io import BytesIO
 import markdown
-from bs4 import BeautifulSoup
+import lxml.html
 from docx import Document
 from docx.shared import Pt, Cm, Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
@@ -18,6 +21,65 @@ import httpx
 
 from .config import DEFAULT_STYLES, get_font_size_pt, FONT_SIZE_MAP
 
+# 常用限定名只解析一次，避免每个 run/段落重复走 qn 的字符串拼接
+_QN_EASTASIA = qn('w:eastAsia')
+_QN_ASCII = qn('w:ascii')
+_QN_HANSI = qn('w:hAnsi')
+_QN_VAL = qn('w:val')
+_QN_FILL = qn('w:fill')
+_QN_BEFORE = qn('w:before')
+_QN_AFTER = qn('w:after')
+_QN_LINE = qn('w:line')
+_QN_LINERULE = qn('w:lineRule')
+_QN_XML_SPACE = qn('xml:space')
+
+# 保护代码/公式：四类模式合并成一个备选式，单次 finditer 扫描全文，
+# 不再做四遍整串替换（每遍都要重新分配一份全文）
+_PROTECT_RE = re.compile(
+    r'(?P<fence>```[\s\S]*?```)'
+    r'|`(?P<icode>[^`]+)`'
+    r'|(?P<fblk>\$\$[\s\S]*?\$\$)'
+    r'|\$(?P<iform>[^\$]+)\$'
+)
+# 占位符定界符必须对 Markdown 和 HTML 解析器都中性（角括号会被当成伪标签丢掉）
+_CODE_PH_RE = re.compile(r'%%%CODE_BLOCK_(\d+)%%%')
+_FORMULA_PH_RE = re.compile(r'%%%FORMULA_BLOCK_(\d+)%%%')
+# 恢复占位符：四类合并为一次替换，扫描全部交给正则引擎
+_ANY_PH_RE = re.compile(r'%%%(CODE_BLOCK|INLINE_CODE|FORMULA_BLOCK|INLINE_FORMULA)_(\d+)%%%')
+
+_ALIGN_MAP = {
+    'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
+    'center': WD_ALIGN_PARAGRAPH.CENTER,
+    'right': WD_ALIGN_PARAGRAPH.RIGHT,
+}
+
+
+def _resolve_line_spacing(style_config):
+    """把行距配置解析成 (是否固定值, 数值) 的元组"""
+    spacing_type = style_config.get('line_spacing_type', '1.5倍行距')
+    spacing_value = style_config.get('line_spacing_value', 1.5)
+    
+    # 确保spacing_value是数值
+    if isinstance(spacing_value, str):
+        try:
+            spacing_value = float(spacing_value)
+        except:
+            spacing_value = 20 if spacing_type == '固定值' else 1.5
+    
+    if spacing_type == '固定值':
+        # 固定行距（磅值）
+        return (True, Pt(float(spacing_value)))
+    # 倍数行距
+    return (False, float(spacing_value))
+
+
+def _set_line_spacing(paragraph_format, spacing):
+    """按 _resolve_line_spacing 的结果设置行距"""
+    fixed, value = spacing
+    if fixed:
+        paragraph_format.line_spacing_rule = WD_LINE_SPACING.EXACTLY
+    paragraph_format.line_spacing = value
+
 
 class MarkdownConverter:
     """Markdown 转换器"""
@@ -26,6 +88,12 @@ class MarkdownConverter:
         self.styles = styles or DEFAULT_STYLES
         self.supported_extensions = ['.md', '.markdown']
         self.image_cache = {}
+        # 本地回退下载用的持久连接，避免每张图都付一次 TCP+TLS 握手
+        self._http = None
+        # Markdown 解析器构建一次重复使用：markdown.markdown() 每次调用
+        # 都会重新加载扩展并编译全部行内模式
+        self._md = markdown.Markdown(extensions=['tables', 'fenced_code', 'toc'])
+        self._build_resolved_styles()
     
     def convert_to_docx(self, input_path: str, output_path: str = None,
                         progress_callback=None, styles: dict = None) -> str:
@@ -55,9 +123,9 @@ class MarkdownConverter:
         if styles:
             self.styles = {**DEFAULT_STYLES, **styles}
         
-        # 读取Markdown内容
-        with open(input_path, 'r', encoding='utf-8') as f:
-            md_content = f.read()
+        # 读取Markdown内容：一次整读再解码，
+        # 不走 TextIOWrapper 的 8KB 缓冲与增量解码
+        md_content = input_path.read_bytes().decode('utf-8')
         
         # 获取Markdown文件所在目录，用于解析相对路径图片
         self.base_dir = input_path.parent
@@ -113,66 +181,90 @@ class MarkdownConverter:
         
         return str(output_path)
     
+    def convert_from_stream(self, stream, output_path: str,
+                            progress_callback=None, styles: dict = None,
+                            base_dir: str = None) -> str:
+        """从文本流转换Markdown到DOCX
+
+        适合 mmap 包装或管道输入，内容单次读取后复用字符串转换路径。
+
+        Args:
+            stream: 可读文本流
+            output_path: 输出DOCX文件路径
+            progress_callback: 进度回调函数
+            styles: 自定义样式
+            base_dir: 图片基础目录
+
+        Returns:
+            输出文件路径
+        """
+        return self.convert_from_string(stream.read(), output_path,
+                                        progress_callback=progress_callback,
+                                        styles=styles, base_dir=base_dir)
+
     def _md_to_docx(self, md_content: str, progress_callback=None) -> Document:
         """将Markdown内容转换为Document对象"""
         doc = Document()
         
+        # 每次转换前把样式配置一次解析成原始值，逐段落只查字典
+        self._build_resolved_styles()
+        
         # 设置默认样式
         self._setup_styles(doc)
         
-        # 预处理：提取并保护代码块和公式
+        # 预处理：提取并保护代码块和公式，单次扫描同时填四个列表
         code_blocks = []
-        formulas = []
-        
-        # 保护代码块
-        def save_code_block(match):
-            code_blocks.append(match.group(0))
-            return f"<<<CODE_BLOCK_{len(code_blocks) - 1}>>>"
-        
-        md_content = re.sub(r'```[\s\S]*?```', save_code_block, md_content)
-        
-        # 保护行内代码
         inline_codes = []
-        def save_inline_code(match):
-            inline_codes.append(match.group(1))
-            return f"<<<INLINE_CODE_{len(inline_codes) - 1}>>>"
-        
-        md_content = re.sub(r'`([^`]+)`', save_inline_code, md_content)
-        
-        # 保护公式块
-        def save_formula_block(match):
-            formulas.append(match.group(0))
-            return f"<<<FORMULA_BLOCK_{len(formulas) - 1}>>>"
-        
-        md_content = re.sub(r'\$\$[\s\S]*?\$\$', save_formula_block, md_content)
-        
-        # 保护行内公式
+        formulas = []
         inline_formulas = []
-        def save_inline_formula(match):
-            inline_formulas.append(match.group(1))
-            return f"<<<INLINE_FORMULA_{len(inline_formulas) - 1}>>>"
         
-        md_content = re.sub(r'\$([^\$]+)\$', save_inline_formula, md_content)
+        out = []
+        last = 0
+        for match in _PROTECT_RE.finditer(md_content):
+            out.append(md_content[last:match.start()])
+            if match.group('fence') is not None:
+                code_blocks.append(match.group('fence'))
+                out.append(f"%%%CODE_BLOCK_{len(code_blocks) - 1}%%%")
+            elif match.group('icode') is not None:
+                inline_codes.append(match.group('icode'))
+                out.append(f"%%%INLINE_CODE_{len(inline_codes) - 1}%%%")
+            elif match.group('fblk') is not None:
+                formulas.append(match.group('fblk'))
+                out.append(f"%%%FORMULA_BLOCK_{len(formulas) - 1}%%%")
+            else:
+                inline_formulas.append(match.group('iform'))
+                out.append(f"%%%INLINE_FORMULA_{len(inline_formulas) - 1}%%%")
+            last = match.end()
+        out.append(md_content[last:])
+        md_content = ''.join(out)
         
         # 转换为HTML（用于解析复杂结构）
         # 注意：不使用nl2br扩展，避免列表项中的换行产生额外空行
-        html = markdown.markdown(
-            md_content,
-            extensions=['tables', 'fenced_code', 'toc']
-        )
+        self._md.reset()
+        html = self._md.convert(md_content)
         
-        soup = BeautifulSoup(html, 'lxml')
+        # 直接用 lxml 建树：不再经由 BeautifulSoup 在 lxml 之上二次建树
+        root = lxml.html.fragment_fromstring(html, create_parent='body')
+        
+        # 网络图片先并发预取进缓存，遍历时全部是缓存命中
+        self._prefetch_images(root)
         
         if progress_callback:
             progress_callback(30, "转换文档结构...")
         
-        # 处理每个元素
-        total_elements = len(soup.find_all(True))
+        # 处理每个元素：进度分母取顶层块元素数即可，
+        # 不必为此再做一次整树遍历
+        total_elements = len(root)
         processed = 0
         
-        for element in soup.body.children if soup.body else soup.children:
+        # lxml 中元素间的裸文本挂在 text/tail 上，需要单独处理
+        self._add_plain_text(doc, root.text, code_blocks, inline_codes,
+                             formulas, inline_formulas)
+        for element in root.iterchildren():
             self._process_element(doc, element, code_blocks, inline_codes, 
                                  formulas, inline_formulas)
+            self._add_plain_text(doc, element.tail, code_blocks, inline_codes,
+                                 formulas, inline_formulas)
             processed += 1
             if progress_callback and total_elements > 0:
                 progress = 30 + int(60 * processed / total_elements)
@@ -190,23 +282,95 @@ class MarkdownConverter:
     
     def _apply_line_spacing(self, paragraph_format, style_config):
         """应用行间距设置"""
-        spacing_type = style_config.get('line_spacing_type', '1.5倍行距')
-        spacing_value = style_config.get('line_spacing_value', 1.5)
-        
-        # 确保spacing_value是数值
-        if isinstance(spacing_value, str):
-            try:
-                spacing_value = float(spacing_value)
-            except:
-                spacing_value = 20 if spacing_type == '固定值' else 1.5
-        
-        if spacing_type == '固定值':
-            # 固定行距（磅值）
-            paragraph_format.line_spacing_rule = WD_LINE_SPACING.EXACTLY
-            paragraph_format.line_spacing = Pt(float(spacing_value))
-        else:
-            # 倍数行距
-            paragraph_format.line_spacing = float(spacing_value)
+        _set_line_spacing(paragraph_format, _resolve_line_spacing(style_config))
+    
+    def _build_resolved_styles(self):
+        """把各类样式要反复读取的配置一次解析成原始值
+        
+        字体名、Pt/Cm 长度、对齐枚举、行距元组等都在这里算好，
+        逐段落/逐单元格套用时不再做字典链查找和 Length 分配。
+        """
+        body = self.styles.get('body', {})
+        body_size = self._get_font_size(body)
+        indent = body.get('first_line_indent', 2)
+        resolved = {
+            'body': {
+                'font_cn': body.get('font_name_cn', body.get('font_name', '宋体')),
+                'font_en': body.get('font_name_en', body.get('font_name', 'Times New Roman')),
+                'size': Pt(body_size),
+                'spacing': _resolve_line_spacing(body),
+                'space_before': Pt(body.get('space_before', 0)),
+                'space_after': Pt(body.get('space_after', 0)),
+                'first_line_indent': Pt(body_size * indent) if indent > 0 else None,
+                'alignment': _ALIGN_MAP.get(body.get('alignment', 'left'),
+                                            WD_ALIGN_PARAGRAPH.LEFT),
+            },
+        }
+        
+        for i in range(1, 5):
+            key = f'heading{i}'
+            style = self.styles.get(key, {})
+            resolved[key] = {
+                'font_cn': style.get('font_name_cn', style.get('font_name', '宋体')),
+                'font_en': style.get('font_name_en', style.get('font_name', 'Times New Roman')),
+                'size': Pt(self._get_font_size(style)),
+                'bold': style.get('bold', True),
+                'spacing': _resolve_line_spacing(style),
+                'space_before': Pt(style.get('space_before', 12)),
+                'space_after': Pt(style.get('space_after', 6)),
+                'alignment': (WD_ALIGN_PARAGRAPH.CENTER
+                              if style.get('alignment', 'left') == 'center'
+                              else WD_ALIGN_PARAGRAPH.LEFT),
+            }
+        
+        quote = self.styles.get('quote', {})
+        quote_cn = quote.get('font_name_cn', quote.get('font_name', '楷体'))
+        color = quote.get('color', '#666666')
+        resolved['quote'] = {
+            'left_indent': Cm(quote.get('left_indent', 1)),
+            'space_before': Pt(quote.get('space_before', 6)),
+            'space_after': Pt(quote.get('space_after', 6)),
+            'line_spacing': quote.get('line_spacing', 1.5),
+            'font_cn': quote_cn,
+            'font_en': quote.get('font_name_en', quote_cn),
+            'size': Pt(self._get_font_size(quote) if quote.get('font_size') else 11),
+            'italic': quote.get('italic', True),
+            'color': (RGBColor(int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16))
+                      if color.startswith('#') else None),
+        }
+        
+        code = self.styles.get('code', {})
+        resolved['code'] = {
+            'font': code.get('font_name_en', code.get('font_name', 'Consolas')),
+            'size': Pt(self._get_font_size(code) if code.get('font_size') else 10),
+            'line_spacing': code.get('line_spacing', 1.2),
+            'background': code.get('background', '#f5f5f5'),
+        }
+        
+        table = self.styles.get('table', {})
+        table_cn = table.get('font_name_cn', table.get('font_name', '宋体'))
+        resolved['table'] = {
+            'font_cn': table_cn,
+            'font_en': table.get('font_name_en', table_cn),
+            'size': Pt(self._get_font_size(table) if table.get('font_size') else 10),
+            'header_bold': table.get('header_bold', True),
+        }
+        
+        caption = self.styles.get('caption', {})
+        resolved['caption'] = {
+            'font_cn': caption.get('font_name_cn', '黑体'),
+            'font_en': caption.get('font_name_en', 'Times New Roman'),
+            'size': Pt(self._get_font_size(caption) if caption.get('font_size') else 9),
+            'spacing': _resolve_line_spacing(caption),
+        }
+        
+        formula = self.styles.get('formula', {})
+        resolved['formula'] = {
+            'space_before': Pt(formula.get('space_before', 6)),
+            'space_after': Pt(formula.get('space_after', 6)),
+        }
+        
+        self._resolved = resolved
     
     def _setup_styles(self, doc: Document):
         """设置文档样式"""
@@ -228,7 +392,7 @@ class MarkdownConverter:
             
             # 中文字体
             font_cn = body_style.get('font_name_cn', body_style.get('font_name', '宋体'))
-            normal_style._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
+            normal_style._element.rPr.rFonts.set(_QN_EASTASIA, font_cn)
         except:
             pass
         
@@ -255,29 +419,33 @@ class MarkdownConverter:
                     
                     # 中文字体
                     font_cn = heading_style.get('font_name_cn', heading_style.get('font_name', '宋体'))
-                    style._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
+                    style._element.rPr.rFonts.set(_QN_EASTASIA, font_cn)
                 except:
                     pass
     
+    def _add_plain_text(self, doc, text, code_blocks, inline_codes,
+                        formulas, inline_formulas):
+        """处理元素之间的裸文本（lxml 的 text/tail）"""
+        if not text or not text.strip():
+            return
+        # 恢复特殊内容
+        text = self._restore_special_content(
+            text.strip(), code_blocks, inline_codes, formulas, inline_formulas
+        )
+        if text.strip():
+            p = doc.add_paragraph(text)
+            self._apply_body_style(p)
+    
     def _process_element(self, doc, element, code_blocks, inline_codes, 
                         formulas, inline_formulas):
         """处理单个HTML元素"""
-        if element.name is None:
-            # 纯文本
-            text = str(element).strip()
-            if text:
-                # 恢复特殊内容
-                text = self._restore_special_content(
-                    text, code_blocks, inline_codes, formulas, inline_formulas
-                )
-                if text.strip():
-                    p = doc.add_paragraph(text)
-                    self._apply_body_style(p)
+        if not isinstance(element.tag, str):
+            # 注释等非元素节点
             return
         
-        if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            level = int(element.name[1])
-            text = element.get_text()
+        if element.tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            level = int(element.tag[1])
+            text = element.text_content()
             text = self._restore_special_content(
                 text, code_blocks, inline_codes, formulas, inline_formulas
             )
@@ -286,27 +454,27 @@ class MarkdownConverter:
             run = heading.add_run(text)
             self._apply_heading_style(heading, level)
             
-        elif element.name == 'p':
-            text = element.get_text()
+        elif element.tag == 'p':
+            text = element.text_content()
             
             # 检查是否是特殊内容
-            if '<<<CODE_BLOCK_' in text:
-                match = re.search(r'<<<CODE_BLOCK_(\d+)>>>', text)
+            if '%%%CODE_BLOCK_' in text:
+                match = _CODE_PH_RE.search(text)
                 if match:
                     idx = int(match.group(1))
                     self._add_code_block(doc, code_blocks[idx])
                     return
             
-            if '<<<FORMULA_BLOCK_' in text:
-                match = re.search(r'<<<FORMULA_BLOCK_(\d+)>>>', text)
+            if '%%%FORMULA_BLOCK_' in text:
+                match = _FORMULA_PH_RE.search(text)
                 if match:
                     idx = int(match.group(1))
                     self._add_formula(doc, formulas[idx])
                     return
             
             # 检查是否包含图片
-            img = element.find('img')
-            if img:
+            img = element.find('.//img')
+            if img is not None:
                 self._add_image(doc, img.get('src', ''), img.get('alt', ''))
                 return
             
@@ -317,9 +485,9 @@ class MarkdownConverter:
                 p = doc.add_paragraph(text)
                 self._apply_body_style(p)
                 
-        elif element.name == 'ul':
-            for li in element.find_all('li', recursive=False):
-                text = li.get_text()
+        elif element.tag == 'ul':
+            for li in element.findall('li'):
+                text = li.text_content()
                 # 清理多余的空白和换行
                 text = ' '.join(text.split())
                 text = self._restore_special_content(
@@ -329,9 +497,9 @@ class MarkdownConverter:
                     p = doc.add_paragraph(text, style='List Bullet')
                     self._apply_list_style(p)
                 
-        elif element.name == 'ol':
-            for li in element.find_all('li', recursive=False):
-                text = li.get_text()
+        elif element.tag == 'ol':
+            for li in element.findall('li'):
+                text = li.text_content()
                 # 清理多余的空白和换行
                 text = ' '.join(text.split())
                 text = self._restore_special_content(
@@ -341,107 +509,97 @@ class MarkdownConverter:
                     p = doc.add_paragraph(text, style='List Number')
                     self._apply_list_style(p)
                 
-        elif element.name == 'blockquote':
-            text = element.get_text()
+        elif element.tag == 'blockquote':
+            text = element.text_content()
             text = self._restore_special_content(
                 text, code_blocks, inline_codes, formulas, inline_formulas
             )
             p = doc.add_paragraph(text)
             self._apply_quote_style(p)
             
-        elif element.name == 'pre':
+        elif element.tag == 'pre':
             code = element.find('code')
-            if code:
-                self._add_code_block(doc, code.get_text())
+            if code is not None:
+                self._add_code_block(doc, code.text_content())
             else:
-                self._add_code_block(doc, element.get_text())
+                self._add_code_block(doc, element.text_content())
                 
-        elif element.name == 'table':
+        elif element.tag == 'table':
             self._add_table(doc, element)
             
-        elif element.name == 'img':
+        elif element.tag == 'img':
             self._add_image(doc, element.get('src', ''), element.get('alt', ''))
             
-        elif element.name == 'hr':
+        elif element.tag == 'hr':
             # 添加分隔线
             p = doc.add_paragraph()
             p.add_run('─' * 50)
             pf = p.paragraph_format
             pf.alignment = WD_ALIGN_PARAGRAPH.CENTER
             
-        elif element.name in ['div', 'section', 'article']:
-            # 递归处理容器元素
-            for child in element.children:
+        elif element.tag in ('div', 'section', 'article'):
+            # 递归处理容器元素（含子元素之间的裸文本）
+            self._add_plain_text(doc, element.text, code_blocks, inline_codes,
+                                 formulas, inline_formulas)
+            for child in element.iterchildren():
                 self._process_element(doc, child, code_blocks, inline_codes,
                                      formulas, inline_formulas)
+                self._add_plain_text(doc, child.tail, code_blocks, inline_codes,
+                                     formulas, inline_formulas)
     
     def _restore_special_content(self, text, code_blocks, inline_codes, 
                                  formulas, inline_formulas):
-        """恢复特殊内容（代码、公式）"""
-        # 恢复代码块
-        for i, code in enumerate(code_blocks):
-            text = text.replace(f'<<<CODE_BLOCK_{i}>>>', '')
-        
-        # 恢复行内代码
-        for i, code in enumerate(inline_codes):
-            text = text.replace(f'<<<INLINE_CODE_{i}>>>', f'「{code}」')
-        
-        # 恢复公式块
-        for i, formula in enumerate(formulas):
-            text = text.replace(f'<<<FORMULA_BLOCK_{i}>>>', '')
-        
-        # 恢复行内公式
-        for i, formula in enumerate(inline_formulas):
-            text = text.replace(f'<<<INLINE_FORMULA_{i}>>>', f'[公式: {formula}]')
-        
-        return text
+        """恢复特殊内容（代码、公式）：单次正则替换完成全部占位符"""
+        if '%%%' not in text:
+            return text
+        
+        def restore(match):
+            kind = match.group(1)
+            idx = int(match.group(2))
+            if kind == 'INLINE_CODE':
+                return f'「{inline_codes[idx]}」'
+            if kind == 'INLINE_FORMULA':
+                return f'[公式: {inline_formulas[idx]}]'
+            # 代码块/公式块由专门的处理分支生成，这里只清掉占位符
+            return ''
+        
+        return _ANY_PH_RE.sub(restore, text)
     
     def _apply_body_style(self, paragraph):
         """应用正文样式"""
-        style = self.styles.get('body', {})
+        rs = self._resolved['body']
         pf = paragraph.paragraph_format
         
         # 行距
-        self._apply_line_spacing(pf, style)
+        _set_line_spacing(pf, rs['spacing'])
         
         # 段前段后间距
-        pf.space_before = Pt(style.get('space_before', 0))
-        pf.space_after = Pt(style.get('space_after', 0))
+        pf.space_before = rs['space_before']
+        pf.space_after = rs['space_after']
         
         # 首行缩进
-        indent = style.get('first_line_indent', 2)
-        if indent > 0:
-            font_size = self._get_font_size(style)
-            pf.first_line_indent = Pt(font_size * indent)
+        if rs['first_line_indent'] is not None:
+            pf.first_line_indent = rs['first_line_indent']
         
         # 对齐方式
-        alignment = style.get('alignment', 'left')
-        if alignment == 'justify':
-            pf.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        elif alignment == 'center':
-            pf.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        elif alignment == 'right':
-            pf.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-        else:
-            pf.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        pf.alignment = rs['alignment']
         
         # 字体设置
-        font_cn = style.get('font_name_cn', style.get('font_name', '宋体'))
-        font_en = style.get('font_name_en', style.get('font_name', 'Times New Roman'))
-        font_size = self._get_font_size(style)
-        
+        font_en = rs['font_en']
+        font_cn = rs['font_cn']
+        size = rs['size']
         for run in paragraph.runs:
             run.font.name = font_en
-            run.font.size = Pt(font_size)
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
+            run.font.size = size
+            run._element.rPr.rFonts.set(_QN_EASTASIA, font_cn)
 
     def _apply_list_style(self, paragraph):
         """应用列表样式（无首行缩进，无段前段后间距）"""
-        style = self.styles.get('body', {})
+        rs = self._resolved['body']
         pf = paragraph.paragraph_format
         
         # 行距
-        self._apply_line_spacing(pf, style)
+        _set_line_spacing(pf, rs['spacing'])
         
         # 列表项不设置段前段后间距，避免空行
         pf.space_before = Pt(0)
@@ -451,82 +609,62 @@ class MarkdownConverter:
         pf.first_line_indent = Pt(0)
         
         # 对齐方式
-        alignment = style.get('alignment', 'left')
-        if alignment == 'justify':
-            pf.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        elif alignment == 'center':
-            pf.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        elif alignment == 'right':
-            pf.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-        else:
-            pf.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        pf.alignment = rs['alignment']
         
         # 字体设置
-        font_cn = style.get('font_name_cn', style.get('font_name', '宋体'))
-        font_en = style.get('font_name_en', style.get('font_name', 'Times New Roman'))
-        font_size = self._get_font_size(style)
-        
+        font_en = rs['font_en']
+        font_cn = rs['font_cn']
+        size = rs['size']
         for run in paragraph.runs:
             run.font.name = font_en
-            run.font.size = Pt(font_size)
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
+            run.font.size = size
+            run._element.rPr.rFonts.set(_QN_EASTASIA, font_cn)
     
     def _apply_heading_style(self, heading, level):
         """应用标题样式"""
-        style_key = f'heading{min(level, 4)}'
-        style = self.styles.get(style_key, {})
+        rs = self._resolved[f'heading{min(level, 4)}']
         
         pf = heading.paragraph_format
-        pf.space_before = Pt(style.get('space_before', 12))
-        pf.space_after = Pt(style.get('space_after', 6))
-        self._apply_line_spacing(pf, style)
+        pf.space_before = rs['space_before']
+        pf.space_after = rs['space_after']
+        _set_line_spacing(pf, rs['spacing'])
         
         # 对齐方式
-        alignment = style.get('alignment', 'left')
-        if alignment == 'center':
-            pf.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        else:
-            pf.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        
-        font_cn = style.get('font_name_cn', style.get('font_name', '宋体'))
-        font_en = style.get('font_name_en', style.get('font_name', 'Times New Roman'))
-        font_size = self._get_font_size(style)
+        pf.alignment = rs['alignment']
         
+        font_en = rs['font_en']
+        font_cn = rs['font_cn']
+        size = rs['size']
+        bold = rs['bold']
         for run in heading.runs:
             run.font.name = font_en
-            run.font.size = Pt(font_size)
-            run.font.bold = style.get('bold', True)
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
+            run.font.size = size
+            run.font.bold = bold
+            run._element.rPr.rFonts.set(_QN_EASTASIA, font_cn)
     
     def _apply_quote_style(self, paragraph):
         """应用引用样式"""
-        style = self.styles.get('quote', {})
+        rs = self._resolved['quote']
         pf = paragraph.paragraph_format
         
-        pf.left_indent = Cm(style.get('left_indent', 1))
-        pf.space_before = Pt(style.get('space_before', 6))
-        pf.space_after = Pt(style.get('space_after', 6))
-        pf.line_spacing = style.get('line_spacing', 1.5)
-        
-        font_size = self._get_font_size(style) if style.get('font_size') else 11
-        font_name = style.get('font_name_cn', style.get('font_name', '楷体'))
+        pf.left_indent = rs['left_indent']
+        pf.space_before = rs['space_before']
+        pf.space_after = rs['space_after']
+        pf.line_spacing = rs['line_spacing']
         
+        color = rs['color']
         for run in paragraph.runs:
-            run.font.name = style.get('font_name_en', font_name)
-            run.font.size = Pt(font_size)
-            run.font.italic = style.get('italic', True)
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), font_name)
+            run.font.name = rs['font_en']
+            run.font.size = rs['size']
+            run.font.italic = rs['italic']
+            run._element.rPr.rFonts.set(_QN_EASTASIA, rs['font_cn'])
             
-            color = style.get('color', '#666666')
-            if color.startswith('#'):
-                r = int(color[1:3], 16)
-                g = int(color[3:5], 16)
-                b = int(color[5:7], 16)
-                run.font.color.rgb = RGBColor(r, g, b)
+            if color is not None:
+                run.font.color.rgb = color
     
     def _add_code_block(self, doc, code_text):
         """添加代码块"""
-        style = self.styles.get('code', {})
+        rs = self._resolved['code']
         
         # 清理代码文本
         if code_text.startswith('```'):
@@ -535,24 +673,41 @@ class MarkdownConverter:
             lines = lines[1:-1] if lines[-1].strip() == '```' else lines[1:]
             code_text = '\n'.join(lines)
         
-        # 创建代码段落
-        font_size = self._get_font_size(style) if style.get('font_size') else 10
-        font_name = style.get('font_name_en', style.get('font_name', 'Consolas'))
+        # 段落/run 属性模板各构建一次（底纹折进 pPr），
+        # 逐行只做 deepcopy 插入，不再按行走 python-docx 的描述符赋值
+        rpr = OxmlElement('w:rPr')
+        rfonts = OxmlElement('w:rFonts')
+        rfonts.set(_QN_ASCII, rs['font'])
+        rfonts.set(_QN_HANSI, rs['font'])
+        rfonts.set(_QN_EASTASIA, 'Consolas')
+        sz = OxmlElement('w:sz')
+        sz.set(_QN_VAL, str(int(rs['size'].pt * 2)))
+        rpr.append(rfonts)
+        rpr.append(sz)
+        
+        ppr = OxmlElement('w:pPr')
+        spacing_el = OxmlElement('w:spacing')
+        spacing_el.set(_QN_BEFORE, '0')
+        spacing_el.set(_QN_AFTER, '0')
+        line_spacing = rs['line_spacing']
+        spacing_el.set(_QN_LINE, str(int(line_spacing * 240)))
+        spacing_el.set(_QN_LINERULE, 'auto')
+        ppr.append(spacing_el)
+        background = rs['background']
+        shd = OxmlElement('w:shd')
+        shd.set(_QN_FILL, background[1:] if background.startswith('#') else background)
+        ppr.append(shd)
         
         for line in code_text.split('\n'):
-            p = doc.add_paragraph()
-            run = p.add_run(line)
-            run.font.name = font_name
-            run.font.size = Pt(font_size)
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Consolas')
-            
-            pf = p.paragraph_format
-            pf.space_before = Pt(0)
-            pf.space_after = Pt(0)
-            pf.line_spacing = style.get('line_spacing', 1.2)
-            
-            # 添加背景色（通过底纹）
-            self._add_shading(p, style.get('background', '#f5f5f5'))
+            p_el = doc.add_paragraph()._p
+            p_el.append(copy.deepcopy(ppr))
+            r_el = OxmlElement('w:r')
+            r_el.append(copy.deepcopy(rpr))
+            t_el = OxmlElement('w:t')
+            t_el.text = line
+            t_el.set(_QN_XML_SPACE, 'preserve')
+            r_el.append(t_el)
+            p_el.append(r_el)
     
     def _add_shading(self, paragraph, color):
         """为段落添加底纹"""
@@ -560,12 +715,12 @@ class MarkdownConverter:
             color = color[1:]
         
         shading = OxmlElement('w:shd')
-        shading.set(qn('w:fill'), color)
+        shading.set(_QN_FILL, color)
         paragraph._p.get_or_add_pPr().append(shading)
     
     def _add_formula(self, doc, formula_text):
         """添加公式"""
-        style = self.styles.get('formula', {})
+        rs = self._resolved['formula']
         
         # 清理公式文本
         formula_text = formula_text.strip()
@@ -582,21 +737,27 @@ class MarkdownConverter:
         
         pf = p.paragraph_format
         pf.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        pf.space_before = Pt(style.get('space_before', 6))
-        pf.space_after = Pt(style.get('space_after', 6))
+        pf.space_before = rs['space_before']
+        pf.space_after = rs['space_after']
     
     def _add_image(self, doc, src, alt=''):
         """添加图片"""
         style = self.styles.get('image', {})
         
         try:
-            # 判断图片来源
+            # 判断图片来源；三类来源统一缓存原始字节，
+            # 同一张图多次出现时不再重复读盘/解码
             if src.startswith('data:image'):
                 # Base64 图片
-                image_data = self._decode_base64_image(src)
+                key = 'data:' + hashlib.sha1(src.encode()).hexdigest()
+                if key not in self.image_cache:
+                    data = src.split(',')[1] if ',' in src else src
+                    self.image_cache[key] = base64.b64decode(data)
             elif src.startswith(('http://', 'https://')):
-                # 网络图片
-                image_data = self._download_image(src)
+                # 网络图片（预取命中时 _download_image 直接走缓存）
+                key = src
+                if key not in self.image_cache:
+                    self._download_image(src)
             else:
                 # 本地图片
                 img_path = self.base_dir / src if hasattr(self, 'base_dir') else Path(src)
@@ -605,7 +766,13 @@ class MarkdownConverter:
                     pf = p.paragraph_format
                     pf.alignment = WD_ALIGN_PARAGRAPH.CENTER
                     return
-                image_data = str(img_path)
+                key = str(img_path.resolve())
+                if key not in self.image_cache:
+                    self.image_cache[key] = img_path.read_bytes()
+            
+            image_bytes = self.image_cache[key]
+            # 先经 PIL 校验一次，坏图早失败，不让 python-docx 打开损坏流
+            Image.open(BytesIO(image_bytes)).verify()
             
             # 添加图片
             p = doc.add_paragraph()
@@ -615,30 +782,20 @@ class MarkdownConverter:
             pf.space_after = Pt(style.get('space_after', 6))
             
             run = p.add_run()
-            
-            if isinstance(image_data, str):
-                # 文件路径
-                run.add_picture(image_data, width=Cm(style.get('max_width', 15)))
-            else:
-                # BytesIO
-                run.add_picture(image_data, width=Cm(style.get('max_width', 15)))
+            run.add_picture(BytesIO(image_bytes), width=Cm(style.get('max_width', 15)))
             
             # 添加图片说明（使用caption样式）
             if alt:
                 caption_p = doc.add_paragraph(alt)
-                caption_style = self.styles.get('caption', {})
+                rs = self._resolved['caption']
                 
                 caption_p.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                self._apply_line_spacing(caption_p.paragraph_format, caption_style)
-                
-                font_cn = caption_style.get('font_name_cn', '黑体')
-                font_en = caption_style.get('font_name_en', 'Times New Roman')
-                font_size = self._get_font_size(caption_style) if caption_style.get('font_size') else 9
+                _set_line_spacing(caption_p.paragraph_format, rs['spacing'])
                 
                 for run in caption_p.runs:
-                    run.font.name = font_en
-                    run.font.size = Pt(font_size)
-                    run._element.rPr.rFonts.set(qn('w:eastAsia'), font_cn)
+                    run.font.name = rs['font_en']
+                    run.font.size = rs['size']
+                    run._element.rPr.rFonts.set(_QN_EASTASIA, rs['font_cn'])
                     
         except Exception as e:
             # 图片加载失败，显示占位符
@@ -646,6 +803,38 @@ class MarkdownConverter:
             pf = p.paragraph_format
             pf.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
+    def _prefetch_images(self, root):
+        """并发预取文档里的全部网络图片
+        
+        串行下载的耗时是各请求往返之和；先收集所有 http(s) 图片地址，
+        用 AsyncClient 一次并发取回，之后 _download_image 全走缓存。
+        """
+        urls = []
+        for img in root.iter('img'):
+            url = img.get('src', '')
+            if url.startswith(('http://', 'https://')) \
+                    and url not in self.image_cache and url not in urls:
+                urls.append(url)
+        if not urls:
+            return
+        try:
+            asyncio.run(self._fetch_all(urls))
+        except Exception:
+            # 预取失败不致命，遍历时仍会按单张回退下载
+            pass
+    
+    async def _fetch_all(self, urls):
+        """用单个 AsyncClient 并发抓取所有图片"""
+        limits = httpx.Limits(max_connections=16)
+        async with httpx.AsyncClient(timeout=30.0, limits=limits,
+                                     follow_redirects=True) as client:
+            responses = await asyncio.gather(
+                *(client.get(url) for url in urls), return_exceptions=True
+            )
+        for url, response in zip(urls, responses):
+            if not isinstance(response, Exception) and response.status_code < 400:
+                self.image_cache[url] = response.content
+    
     def _decode_base64_image(self, data_url):
         """解码Base64图片"""
         # 提取base64数据
@@ -661,25 +850,25 @@ class MarkdownConverter:
             return BytesIO(self.image_cache[url])
         
         try:
-            with httpx.Client(timeout=30.0) as client:
-                response = client.get(url)
-                response.raise_for_status()
-                self.image_cache[url] = response.content
-                return BytesIO(response.content)
+            if self._http is None:
+                self._http = httpx.Client(timeout=30.0, follow_redirects=True)
+            response = self._http.get(url)
+            response.raise_for_status()
+            self.image_cache[url] = response.content
+            return BytesIO(response.content)
         except:
             raise Exception(f"无法下载图片: {url}")
     
     def _add_table(self, doc, table_element):
         """添加表格"""
-        style = self.styles.get('table', {})
+        rs = self._resolved['table']
         
-        rows = table_element.find_all('tr')
+        rows = table_element.findall('.//tr')
         if not rows:
             return
         
         # 计算列数
-        first_row = rows[0]
-        cols = len(first_row.find_all(['th', 'td']))
+        cols = sum(1 for c in rows[0] if c.tag in ('th', 'td'))
         
         if cols == 0:
             return
@@ -688,24 +877,35 @@ class MarkdownConverter:
         table = doc.add_table(rows=len(rows), cols=cols)
         table.style = 'Table Grid'
         
+        # 单元格 run 属性模板：正文与表头各构建一次，
+        # 逐格只做 deepcopy 插入，不再对每个 run 走多次描述符赋值
+        sz_val = str(int(rs['size'].pt * 2))
+        
+        def build_rpr(bold):
+            rpr = OxmlElement('w:rPr')
+            rfonts = OxmlElement('w:rFonts')
+            rfonts.set(_QN_ASCII, rs['font_en'])
+            rfonts.set(_QN_HANSI, rs['font_en'])
+            rfonts.set(_QN_EASTASIA, rs['font_cn'])
+            rpr.append(rfonts)
+            if bold:
+                rpr.append(OxmlElement('w:b'))
+            sz = OxmlElement('w:sz')
+            sz.set(_QN_VAL, sz_val)
+            rpr.append(sz)
+            return rpr
+        
+        body_rpr = build_rpr(False)
+        header_rpr = build_rpr(rs['header_bold'])
+        
         for i, row in enumerate(rows):
-            cells = row.find_all(['th', 'td'])
+            cells = [c for c in row if c.tag in ('th', 'td')]
             for j, cell in enumerate(cells):
                 if j < cols:
                     table_cell = table.rows[i].cells[j]
-                    table_cell.text = cell.get_text().strip()
-                    
-                    # 设置字体
-                    table_font_size = self._get_font_size(style) if style.get('font_size') else 10
-                    table_font_cn = style.get('font_name_cn', style.get('font_name', '宋体'))
-                    table_font_en = style.get('font_name_en', table_font_cn)
+                    table_cell.text = cell.text_content().strip()
                     
-                    for p in table_cell.paragraphs:
-                        for run in p.runs:
-                            run.font.name = table_font_en
-                            run.font.size = Pt(table_font_size)
-                            run._element.rPr.rFonts.set(qn('w:eastAsia'), table_font_cn)
-                            
-                            # 表头加粗
-                            if cell.name == 'th' and style.get('header_bold', True):
-                                run.font.bold = True
+                    # cell.text 赋值后恰好是一个段落一个 run
+                    run = table_cell.paragraphs[0].runs[0]
+                    template = header_rpr if cell.tag == 'th' else body_rpr
+                    run._element.insert(0, copy.deepcopy(template))
@@ -1,12 +1,26 @@
 """模板管理模块"""
 
+import functools
 import json
 import os
+import re
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
 from .config import DEFAULT_STYLES
 
+# 文件名清理：一次 C 级正则替换代替逐字符生成式，结果按名称缓存
+_SAFE_NAME_RE = re.compile(r'[^\w \-]')
+
+
+@functools.lru_cache(maxsize=256)
+def _safe_name(name: str) -> str:
+    """将模板名称清理为安全的文件名"""
+    return _SAFE_NAME_RE.sub('', name).strip().replace(' ', '_')
+
+# 目录内的模板目录索引文件：列表操作只读它，不再逐个打开模板
+_INDEX_NAME = "_index.json"
+
 
 class TemplateManager:
     """样式模板管理器"""
@@ -21,6 +35,41 @@ class TemplateManager:
         # 确保目录存在
         self.template_dir.mkdir(parents=True, exist_ok=True)
     
+    @property
+    def _index_path(self) -> Path:
+        return self.template_dir / _INDEX_NAME
+    
+    def _load_index(self) -> Optional[Dict[str, Dict[str, str]]]:
+        """读取索引，损坏或缺失时返回None"""
+        try:
+            return json.loads(self._index_path.read_bytes())
+        except:
+            return None
+    
+    def _write_index(self, index: Dict[str, Dict[str, str]]):
+        try:
+            with open(self._index_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+        except:
+            pass
+    
+    def _rebuild_index(self) -> Dict[str, Dict[str, str]]:
+        """全量扫描模板目录重建索引（仅在索引缺失/损坏时走一次）"""
+        index = {}
+        for file_path in self.template_dir.glob("*.json"):
+            if file_path.name == _INDEX_NAME:
+                continue
+            try:
+                data = json.loads(file_path.read_bytes())
+                index[file_path.stem] = {
+                    "name": data.get("name", file_path.stem),
+                    "description": data.get("description", ""),
+                }
+            except:
+                continue
+        self._write_index(index)
+        return index
+    
     def save_template(self, name: str, styles: Dict[str, Any], description: str = "") -> str:
         """保存模板
         
@@ -39,14 +88,18 @@ class TemplateManager:
         }
         
         # 清理文件名
-        safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_name = safe_name.replace(' ', '_')
+        safe_name = _safe_name(name)
         
         file_path = self.template_dir / f"{safe_name}.json"
         
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(template_data, f, ensure_ascii=False, indent=2)
         
+        # 同步更新索引
+        index = self._load_index() or self._rebuild_index()
+        index[safe_name] = {"name": name, "description": description}
+        self._write_index(index)
+        
         return str(file_path)
     
     def load_template(self, name: str) -> Optional[Dict[str, Any]]:
@@ -58,16 +111,14 @@ class TemplateManager:
         Returns:
             模板样式配置，如果不存在返回None
         """
-        safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_name = safe_name.replace(' ', '_')
+        safe_name = _safe_name(name)
         
         file_path = self.template_dir / f"{safe_name}.json"
         
         if not file_path.exists():
             return None
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            template_data = json.load(f)
+        template_data = json.loads(file_path.read_bytes())
         
         return template_data.get("styles", {})
     
@@ -80,13 +131,15 @@ class TemplateManager:
         Returns:
             是否删除成功
         """
-        safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_name = safe_name.replace(' ', '_')
+        safe_name = _safe_name(name)
         
         file_path = self.template_dir / f"{safe_name}.json"
         
         if file_path.exists():
             os.remove(file_path)
+            index = self._load_index()
+            if index is not None and index.pop(safe_name, None) is not None:
+                self._write_index(index)
             return True
         return False
     
@@ -96,26 +149,29 @@ class TemplateManager:
         Returns:
             模板列表，每个元素包含name和description
         """
-        templates = []
+        index = self._load_index()
+        if index is None:
+            index = self._rebuild_index()
         
-        for file_path in self.template_dir.glob("*.json"):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    templates.append({
-                        "name": data.get("name", file_path.stem),
-                        "description": data.get("description", ""),
-                        "file": str(file_path)
-                    })
-            except:
+        templates = []
+        for safe_name, entry in index.items():
+            file_path = self.template_dir / f"{safe_name}.json"
+            # 防御外部直接删除文件导致的陈旧索引项
+            if not file_path.exists():
                 continue
+            templates.append({
+                "name": entry.get("name", safe_name),
+                "description": entry.get("description", ""),
+                "file": str(file_path)
+            })
         
         return templates
     
     def get_builtin_templates(self) -> Dict[str, Dict[str, Any]]:
         """获取内置模板"""
+        # DEFAULT_STYLES 是只读映射，复制为普通 dict 以便序列化/修改
         return {
-            "默认样式": DEFAULT_STYLES,
+            "默认样式": dict(DEFAULT_STYLES),
         }
     
     def rename_template(self, old_name: str, new_name: str) -> bool: